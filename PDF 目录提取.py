@@ -2,12 +2,27 @@ import sys
 import re
 import pdfplumber
 import os
+import json
+import time
+import logging
+import math
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from array import array
+from contextlib import contextmanager
+from dataclasses import dataclass, fields, replace
+from functools import lru_cache
 import openpyxl
+try:
+    import re._parser as sre_parse  # Python 3.11+
+except ImportError:
+    import sre_parse
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
-                             QLabel, QLineEdit, QPushButton, QTableWidget, QTableWidgetItem,
+                             QLabel, QLineEdit, QPushButton, QTableWidget, QTableWidgetItem, QTableView,
                              QFileDialog, QMessageBox, QHeaderView, QTextEdit, QMenu, QSizePolicy,
-                             QProgressBar, QCheckBox, QInputDialog, QDialog)
-from PyQt5.QtCore import Qt, QTimer
+                             QProgressBar, QCheckBox, QInputDialog, QDialog, QStyledItemDelegate)
+from PyQt5.QtCore import Qt, QTimer, QThread, pyqtSignal, QAbstractTableModel, QModelIndex
 from PyQt5.QtGui import QIcon  # 添加QIcon导入
 # 添加用于多栏识别的库
 import fitz  # PyMuPDF
@@ -28,6 +43,8 @@ if HAS_TESSERACT:
     except:
         pass
 
+logger = logging.getLogger("pdf2excel")
+
 def convert_to_chinese_num(n):
     chinese_nums = ['零', '一', '二', '三', '四', '五', '六', '七', '八', '九', '十']
     if isinstance(n, str):
@@ -58,6 +75,1227 @@ def convert_roman_to_int(s):
             result += roman_dict[s[i]]
     return result
 
+CHINESE_DIGITS = {'零': 0, '一': 1, '二': 2, '两': 2, '三': 3, '四': 4, '五': 5, '六': 6, '七': 7, '八': 8, '九': 9}
+CHINESE_UNITS = {'十': 10, '百': 100, '千': 1000, '万': 10000}
+
+def convert_chinese_to_int(s):
+    """将中文数字转换为整数，支持十、百、千、万，无法识别时返回None"""
+    if not s:
+        return None
+    total = 0  # 万以上的部分
+    section = 0  # 万以内的部分
+    number = 0
+    for char in s:
+        if char in CHINESE_DIGITS:
+            number = CHINESE_DIGITS[char]
+        elif char in CHINESE_UNITS:
+            unit = CHINESE_UNITS[char]
+            if unit == 10000:
+                total += (section + number) * unit
+                section = 0
+            else:
+                # "十二" 中省略的 "一"
+                section += (number or 1) * unit
+            number = 0
+        else:
+            return None
+    return total + section + number
+
+_ORDINAL_PATTERNS = {
+    'n': re.compile(r'^\D{0,3}?(\d+(?:\s*[.\-]\s*\d+)*)'),
+    'c': re.compile(r'^\D{0,2}?([零一二两三四五六七八九十百千万]+)'),
+    'r': re.compile(r'^\W{0,2}([IVXLCDM]+)(?![a-zA-Z])'),
+    'e': re.compile(r'^\W{0,2}([a-zA-Z])(?![a-zA-Z])'),
+}
+
+def extract_ordinal(text, kind, position=0):
+    """从标题开头的编号中取出 (上级编号, 序号)，无法取出时返回None
+
+    position 指定多级编号（如 n.n）取第几级，前面各级作为上级编号，
+    例如 "3.2 标题" 取第二级得到 ((3,), 2)。
+    """
+    pattern = _ORDINAL_PATTERNS.get(kind)
+    m = pattern.match(text) if pattern else None
+    if not m:
+        return None
+    token = m.group(1)
+    if kind == 'n':
+        numbers = [int(number) for number in re.findall(r'\d+', token)]
+        if position >= len(numbers):
+            return None
+        return tuple(numbers[:position]), numbers[position]
+    if kind == 'c':
+        ordinal = convert_chinese_to_int(token)
+        return ((), ordinal) if ordinal is not None else None
+    if kind == 'r':
+        return (), convert_roman_to_int(token)
+    return (), ord(token.lower()) - ord('a') + 1
+
+NATURAL_CHAIN_SLACK = 1  # 从头编号的链比最长链短不超过这么多项时仍优先采用
+
+def longest_ordinal_chain(ordinals, max_gap=1):
+    """求最长的递增编号链（相邻两项相差 1..max_gap），返回链上元素的下标集合
+
+    ordinals 中每项为 extract_ordinal 的结果，只有上级编号相同的项才能连成链。
+    best_at 记录以某个序号结尾的最长链的末尾位置，每个元素只查 max_gap 次，
+    整体为线性时间。从1（允许跳号时为1..max_gap）开始的链只在长度相近
+    （最多短 NATURAL_CHAIN_SLACK 项）时优先，不会让很短的链胜过明显更长的链。
+    """
+    length = [0] * len(ordinals)
+    prev = [-1] * len(ordinals)
+    start = [ordinal for _, ordinal in ordinals]
+    best_at = {}
+    best_end = -1
+    best_natural_end = -1  # 从头开始编号的最长链
+    for i, (prefix, ordinal) in enumerate(ordinals):
+        length[i] = 1
+        for step in range(1, max_gap + 1):
+            j = best_at.get((prefix, ordinal - step))
+            if j is not None and length[j] + 1 > length[i]:
+                length[i] = length[j] + 1
+                prev[i] = j
+                start[i] = start[j]
+        key = (prefix, ordinal)
+        if key not in best_at or length[i] > length[best_at[key]]:
+            best_at[key] = i
+        if best_end < 0 or length[i] > length[best_end]:
+            best_end = i
+        if start[i] <= max_gap and (best_natural_end < 0 or length[i] > length[best_natural_end]):
+            best_natural_end = i
+    if best_natural_end >= 0 and length[best_natural_end] + NATURAL_CHAIN_SLACK >= length[best_end]:
+        best_end = best_natural_end
+    chain = set()
+    while best_end >= 0:
+        chain.add(best_end)
+        best_end = prev[best_end]
+    return chain
+
+class Instrumentation:
+    """记录各处理阶段（提取、OCR、解析、清理、渲染、导出）的耗时和计数"""
+    STAGES = ('extract', 'ocr', 'parse', 'clean', 'render', 'export')
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """清空统计，每次处理新文档前调用"""
+        self.timings = {stage: 0.0 for stage in self.STAGES}
+        self.counters = {stage: {} for stage in self.STAGES}
+
+    @contextmanager
+    def stage(self, name):
+        """计时上下文，同一阶段多次进入时累加耗时"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+
+    def add_time(self, stage, seconds):
+        self.timings[stage] = self.timings.get(stage, 0.0) + seconds
+
+    def count(self, stage, name, n=1):
+        counters = self.counters.setdefault(stage, {})
+        counters[name] = counters.get(name, 0) + n
+
+    def to_dict(self):
+        return {
+            stage: {'seconds': round(self.timings.get(stage, 0.0), 6), **self.counters.get(stage, {})}
+            for stage in self.timings
+        }
+
+    def to_json(self, **extra):
+        """导出为JSON字符串，extra中的字段（如文件名）一并写入"""
+        return json.dumps({**extra, 'stages': self.to_dict()}, ensure_ascii=False)
+
+    def merge(self, other):
+        """合并另一个统计对象（例如子进程返回的统计）"""
+        for stage, seconds in other.timings.items():
+            self.add_time(stage, seconds)
+        for stage, counters in other.counters.items():
+            for name, n in counters.items():
+                self.count(stage, name, n)
+
+    def dump(self, path, **extra):
+        """以JSON Lines格式追加写入文件，便于批量运行后汇总"""
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write(self.to_json(**extra) + "\n")
+
+    def log_summary(self):
+        for stage, info in self.to_dict().items():
+            if info['seconds'] or len(info) > 1:
+                logger.info("阶段 %s: %s", stage, info)
+
+# 页面分隔标记，由文本提取阶段插入
+PAGE_MARKER_PATTERN = re.compile(r'^=== 第(\d+)页 ===$')
+# 单独成行的页码
+PAGE_ONLY_PATTERN = re.compile(r'^\d{1,4}$')
+# 行尾带页码（点号引导线或至少两个空格后跟数字）
+TRAILING_PAGE_PATTERN = re.compile(r'(?:\.{3,}|…+|·{3,}|\s{2,}|\t)\s*\d{1,4}\s*$')
+# 清理标题时识别并取出的页码
+_TRAILING_DOTS_PATTERN = re.compile(r'\.{3,}\s*$')
+_LEADER_PAGE_PATTERN = re.compile(r'\.{3,}\s*(\d{1,3})\s*$')
+_SPACED_PAGE_PATTERN = re.compile(r'\s{2,}(\d{1,3})\s*$')
+# 按文字位置识别出的页码，由文本提取阶段以制表符接在标题后
+GEOMETRY_PAGE_SEPARATOR = '\t'
+_GEOMETRY_PAGE_PATTERN = re.compile(r'\t(\d{1,4})\s*$')
+
+def _is_number_only(line):
+    """判断是否只有编号没有标题内容，如 1-2-、3.1、IV."""
+    for c in line:
+        if c.isalpha() and c not in 'IVX':  # 排除罗马数字
+            return False
+    return True
+
+def _is_cjk(char):
+    return '\u4e00' <= char <= '\u9fff'
+
+def _join_wrapped(head, tail):
+    """拼接折行的标题，中文之间不插入空格"""
+    if _is_cjk(head[-1]) and _is_cjk(tail[0]):
+        return head + tail
+    return f"{head} {tail}"
+
+# 默认的字符归一化映射：全角标点、数字转半角，OCR 常见的异体字符转为标准形式
+DEFAULT_NORMALIZE_MAP = {
+    '（': '(', '）': ')', '．': '.', '：': ':', '；': ';', '，': ',',
+    '－': '-', '　': ' ', '〇': '零', '○': '零',
+    'Ⅰ': 'I', 'Ⅱ': 'II', 'Ⅲ': 'III', 'Ⅳ': 'IV', 'Ⅴ': 'V',
+    'Ⅵ': 'VI', 'Ⅶ': 'VII', 'Ⅷ': 'VIII', 'Ⅸ': 'IX', 'Ⅹ': 'X',
+    **{chr(0xFF10 + i): str(i) for i in range(10)},  # 全角数字
+}
+# 行首的编号片段中 OCR 常把 0/1 识别成 O/l
+_OCR_NUMBER_PREFIX = re.compile(r'^[\s(]*\d[\dOl.\-]*')
+# 只替换紧跟在数字之后、后面是数字、分隔符、空白或行尾的 O/l，
+# 以字母开头的单词（如 "1.Overview"、"1.lntroduction"）保持原样
+_OCR_DIGIT_RUN = re.compile(r'(?<=\d)[Ol]+(?=[\d.\-、)]|\s|$)')
+_OCR_DIGIT_TABLE = str.maketrans({'O': '0', 'l': '1'})
+
+def _fix_ocr_digits(text):
+    """修复行首编号中被 OCR 识别成 O/l 的 0/1"""
+    m = _OCR_NUMBER_PREFIX.match(text)
+    if not m:
+        return text
+    # 带上编号之后的一个字符，用来判断 O/l 后面是不是单词的其余部分
+    end = m.end() + 1
+    return _OCR_DIGIT_RUN.sub(lambda r: r.group(0).translate(_OCR_DIGIT_TABLE), text[:end]) + text[end:]
+
+class TextNormalizer:
+    """匹配前对每行做一次字符归一化，显示仍使用原文
+
+    映射表通过 str.translate 一次完成替换，层级模式因此只需要写半角形式。
+    """
+    def __init__(self, mapping=None, fix_ocr_digits=True):
+        self.mapping = dict(DEFAULT_NORMALIZE_MAP if mapping is None else mapping)
+        self.fix_ocr_digits = fix_ocr_digits
+        self.table = str.maketrans(self.mapping)
+        # 用于用户手写的正则：归一化后的字符可能是元字符，需要转义
+        self.pattern_table = str.maketrans({k: re.escape(v) for k, v in self.mapping.items()})
+
+    def normalize(self, text):
+        text = text.translate(self.table)
+        if self.fix_ocr_digits:
+            text = _fix_ocr_digits(text)
+        return text
+
+    def normalize_pattern(self, pattern):
+        """把正则表达式中的全角字符换成归一化后的形式，使其能匹配归一化后的行"""
+        return pattern.translate(self.pattern_table)
+
+# 句末标点：含有这些标点的行是正文，不会是折行标题的一部分
+_SENTENCE_PUNCTUATION = re.compile(r'[。！？；!?;]')
+
+class LineAssembler:
+    """流式跨行标题拼接器
+
+    单次线性扫描输入行，借助有界的预读缓冲把拆开的编号与标题、折成
+    两三行的长标题以及单独成行的页码拼成一行。每行只和层级模式匹配
+    一次，匹配结果随行一起输出，解析时不必再次匹配。页面分隔标记是
+    硬边界，不会跨页拼接。
+    """
+    def __init__(self, level_configs, max_lookahead=3, stats=None, normalize=None):
+        self.level_configs = level_configs
+        self.max_lookahead = max_lookahead
+        self.stats = stats
+        self.normalize = normalize
+        self._buffer = deque()
+        self._source = iter(())
+
+    def classify(self, line):
+        """返回行匹配到的层级配置（层级从深到浅尝试），不匹配返回None"""
+        if self.normalize is not None:
+            line = self.normalize(line)
+        for config in self.level_configs:
+            if config['pattern'].match(line):
+                return config
+        return None
+
+    def assemble(self, lines):
+        """输入任意可迭代的行（可以是逐页产出的生成器），逐个产出 (行, 层级配置或None)"""
+        self._buffer = deque()
+        self._source = iter(lines)
+        while self._fill(1):
+            line, config, is_marker = self._buffer.popleft()
+            if not is_marker:
+                line, config = self._join_number_prefix(line, config)
+                if config is not None:
+                    line = self._join_continuation(line)
+            yield line, config
+
+    def _fill(self, n):
+        """保证预读缓冲中至少有n行，输入耗尽时返回False"""
+        while len(self._buffer) < n:
+            line = next(self._source, None)
+            if line is None:
+                return False
+            if PAGE_MARKER_PATTERN.match(line):
+                self._buffer.append((line, None, True))
+            else:
+                self._buffer.append((line, self.classify(line), False))
+        return True
+
+    def _merged(self):
+        if self.stats is not None:
+            self.stats.count('parse', 'merges')
+
+    def _join_number_prefix(self, line, config):
+        """只有编号的行与下一行（非标题）拼接，拼接后须能匹配某个层级"""
+        for _ in range(self.max_lookahead):
+            if not _is_number_only(line) or not self._fill(1):
+                break
+            next_line, next_config, next_is_marker = self._buffer[0]
+            if next_is_marker or next_config is not None:
+                break
+            candidate = f"{line} {next_line}"
+            candidate_config = self.classify(candidate)
+            if candidate_config is None:
+                break
+            logger.debug("检测到跨行标题: '%s' + '%s'", line, next_line)
+            self._buffer.popleft()
+            self._merged()
+            line, config = candidate, candidate_config
+        return line, config
+
+    def _join_continuation(self, line):
+        """标题后若干行内出现页码时，把折行内容和页码拼到标题后
+
+        中间的行含句末标点，或者单独的数字隔着其它行落在页末（正文页的页脚页码）时不拼接。
+        """
+        if TRAILING_PAGE_PATTERN.search(line):
+            return line
+        for ahead in range(1, self.max_lookahead + 1):
+            if not self._fill(ahead):
+                return line
+            text, config, is_marker = self._buffer[ahead - 1]
+            if is_marker or config is not None:
+                return line
+            if PAGE_ONLY_PATTERN.match(text):
+                # 页码后面紧跟标题、分页或结束时才认为它属于当前标题，否则它是下一条的编号
+                if self._fill(ahead + 1):
+                    _, following_config, following_is_marker = self._buffer[ahead]
+                    if following_config is None and not following_is_marker:
+                        return line
+                    at_page_end = following_is_marker
+                else:
+                    at_page_end = True
+                # 隔着其它行、位于页末的数字是正文页的页脚页码，不是当前标题的页码
+                if at_page_end and ahead > 1:
+                    return line
+                parts = [self._buffer.popleft()[0] for _ in range(ahead)]
+                for part in parts[:-1]:
+                    line = _join_wrapped(line, part)
+                self._merged()
+                return f"{line}  {parts[-1]}"
+            if _SENTENCE_PUNCTUATION.search(text):
+                return line  # 正文句子，不是折行的标题
+            if TRAILING_PAGE_PATTERN.search(text):
+                for _ in range(ahead):
+                    line = _join_wrapped(line, self._buffer.popleft()[0])
+                self._merged()
+                return line
+        return line
+
+class PatternSafetyError(Exception):
+    """用户编辑的正则表达式可能导致灾难性回溯"""
+
+# 用于判断两个量词能否吃进同一个字符的探测字符
+_PROBE_CHARS = ' \t\u30000aA一.．-、(（:：,'
+# 构造的最坏情况输入，专门放大空白与数字交替时的回溯
+_ADVERSARIAL_LINES = (
+    ' ' * 3000 + '!',
+    '1 ' * 1500 + '!',
+    '1' + ' ' * 3000 + 'x',
+    '1.' * 1500 + '!',
+    '第' + '一' * 3000 + '!',
+    '1' * 3000 + '!',  # 长串纯数字，放大 \d+\s*\d+ 这类相邻数字量词的切分组合
+)
+PATTERN_LINE_BUDGET = 0.05  # 每行匹配的时间预算（秒）
+PATTERN_PROBE_TIMEOUT = 3.0  # 整体探测超时（秒）
+PATTERN_PROBE_LINES = 300  # 从文档中取最长的若干行参与探测
+
+def _category_matches(category, ch):
+    name = str(category)
+    if name == 'CATEGORY_DIGIT':
+        return ch.isdigit()
+    if name == 'CATEGORY_NOT_DIGIT':
+        return not ch.isdigit()
+    if name == 'CATEGORY_SPACE':
+        return ch.isspace()
+    if name == 'CATEGORY_NOT_SPACE':
+        return not ch.isspace()
+    if name == 'CATEGORY_WORD':
+        return ch.isalnum() or ch == '_'
+    if name == 'CATEGORY_NOT_WORD':
+        return not (ch.isalnum() or ch == '_')
+    return True
+
+def _atom_matches(op, av, ch):
+    """单字符原子能否匹配ch，无法判断的结构保守地返回True"""
+    name = str(op)
+    if name == 'LITERAL':
+        return ord(ch) == av
+    if name == 'NOT_LITERAL':
+        return ord(ch) != av
+    if name == 'ANY':
+        return ch != '\n'
+    if name == 'IN':
+        negate = False
+        hit = False
+        for sub_op, sub_av in av:
+            sub_name = str(sub_op)
+            if sub_name == 'NEGATE':
+                negate = True
+            elif sub_name == 'LITERAL':
+                hit = hit or ord(ch) == sub_av
+            elif sub_name == 'RANGE':
+                hit = hit or sub_av[0] <= ord(ch) <= sub_av[1]
+            elif sub_name == 'CATEGORY':
+                hit = hit or _category_matches(sub_av, ch)
+            else:
+                hit = True
+        return hit != negate
+    return True
+
+def _first_chars(items):
+    """量词主体可能吃进的探测字符集合（近似）"""
+    chars = set()
+    for op, av in items:
+        name = str(op)
+        if name in ('MAX_REPEAT', 'MIN_REPEAT', 'POSSESSIVE_REPEAT'):
+            chars |= _first_chars(av[2])
+        elif name == 'SUBPATTERN':
+            chars |= _first_chars(av[-1])
+        elif name == 'BRANCH':
+            for branch in av[1]:
+                chars |= _first_chars(branch)
+        elif name in ('AT', 'ASSERT', 'ASSERT_NOT'):
+            continue
+        else:
+            chars |= {ch for ch in _PROBE_CHARS if _atom_matches(op, av, ch)}
+    return chars
+
+def _nullable(items):
+    """序列能否匹配空串（近似，无法判断的结构按不能处理）"""
+    for op, av in items:
+        name = str(op)
+        if name in ('MAX_REPEAT', 'MIN_REPEAT', 'POSSESSIVE_REPEAT'):
+            if av[0] > 0 and not _nullable(av[2]):
+                return False
+        elif name == 'SUBPATTERN':
+            if not _nullable(av[-1]):
+                return False
+        elif name == 'BRANCH':
+            if not any(_nullable(branch) for branch in av[1]):
+                return False
+        elif name not in ('AT', 'ASSERT', 'ASSERT_NOT'):
+            return False
+    return True
+
+def _leading_chars(items):
+    """序列开头可能匹配的探测字符：逐项累加，遇到不能匹配空串的一项为止"""
+    chars = set()
+    for item in items:
+        if str(item[0]) == 'SUBPATTERN':
+            chars |= _leading_chars(item[1][-1])
+        else:
+            chars |= _first_chars([item])
+        if not _nullable([item]):
+            break
+    return chars
+
+def _has_ambiguous_branch(body):
+    """量词主体中的分支是否有歧义
+
+    两个分支开头能匹配相同字符、两个分支都能匹配空串，或者一个分支能匹配空串而
+    另一个分支的开头能与下一轮重复的开头相同时，同一段输入有多种切分方式。
+    sre 会把分支的公共前缀提到分支之外，(a|a)* 解析为 a(?:|)，(\\d|\\d\\d)+ 解析为
+    \\d(?:|\\d)，所以最后两种情况也要检查。
+    """
+    start = _leading_chars(body)
+    for op, av in body:
+        name = str(op)
+        if name == 'SUBPATTERN':
+            if _has_ambiguous_branch(av[-1]):
+                return True
+        elif name == 'BRANCH':
+            seen = set()
+            nullable = 0
+            for branch in av[1]:
+                chars = _leading_chars(branch)
+                if chars & seen:
+                    return True
+                seen |= chars
+                nullable += _nullable(branch)
+            if nullable > 1 or (nullable and seen & start):
+                return True
+    return False
+
+def _is_unbounded_repeat(item):
+    return str(item[0]) in ('MAX_REPEAT', 'MIN_REPEAT') and item[1][1] == sre_parse.MAXREPEAT
+
+def _contains_unbounded(items):
+    for op, av in items:
+        name = str(op)
+        if name in ('MAX_REPEAT', 'MIN_REPEAT'):
+            if av[1] == sre_parse.MAXREPEAT or _contains_unbounded(av[2]):
+                return True
+        elif name == 'SUBPATTERN' and _contains_unbounded(av[-1]):
+            return True
+        elif name == 'BRANCH' and any(_contains_unbounded(b) for b in av[1]):
+            return True
+    return False
+
+def _repeat_meets_next(items, start, tail_nullable=True):
+    """序列中的无界量词能否一直延伸到下一轮外层重复的开头
+
+    量词之后的剩余部分可以为空、且量词能匹配的字符与外层重复的开头 start 相交时，
+    一段输入既可以由内层量词吃下，也可以留给外层的下一轮，如 (\\s*\\d+)+。
+    """
+    for index, (op, av) in enumerate(items):
+        name = str(op)
+        rest_nullable = tail_nullable and _nullable(items[index + 1:])
+        if name in ('MAX_REPEAT', 'MIN_REPEAT'):
+            if av[1] == sre_parse.MAXREPEAT and rest_nullable and _first_chars(av[2]) & start:
+                return True
+            if _repeat_meets_next(av[2], start, rest_nullable):
+                return True
+        elif name == 'SUBPATTERN':
+            if _repeat_meets_next(av[-1], start, rest_nullable):
+                return True
+        elif name == 'BRANCH':
+            if any(_repeat_meets_next(branch, start, rest_nullable) for branch in av[1]):
+                return True
+    return False
+
+def _always_succeeds(items):
+    """剩余部分是否必然匹配成功（如结尾的 .*），此时前面的歧义不会引发回溯"""
+    return all(str(op) in ('MAX_REPEAT', 'MIN_REPEAT') and av[0] == 0 for op, av in items)
+
+def _lint_items(items, issues):
+    # 展开不带量词的分组，得到实际的匹配序列
+    flat = []
+    for op, av in items:
+        if str(op) == 'SUBPATTERN':
+            flat.extend(av[-1])
+        else:
+            flat.append((op, av))
+    for index, (op, av) in enumerate(flat):
+        name = str(op)
+        if name in ('MAX_REPEAT', 'MIN_REPEAT', 'POSSESSIVE_REPEAT'):
+            body = av[2]
+            if av[1] == sre_parse.MAXREPEAT and name != 'POSSESSIVE_REPEAT' and _contains_unbounded(body):
+                if _repeat_meets_next(body, _leading_chars(body)):
+                    issues.append(('error', "嵌套的无界量词可以匹配下一轮重复的开头（如 (a+)+、(\\s*\\d+)+），可能导致灾难性回溯"))
+                else:
+                    issues.append(('warning', "嵌套的无界量词（如 (\\d+\\.)+），失败时回溯较多"))
+            if av[1] == sre_parse.MAXREPEAT and name != 'POSSESSIVE_REPEAT' and _has_ambiguous_branch(body):
+                issues.append(('error', "重复的分组中多个分支可以匹配相同内容（如 (a|a)*、(\\d|\\d\\d)+），可能导致灾难性回溯"))
+            _lint_items(body, issues)
+            following = flat[index + 1] if index + 1 < len(flat) else None
+            if (following is not None and _is_unbounded_repeat((op, av)) and _is_unbounded_repeat(following)
+                    and _first_chars(body) & _first_chars(following[1][2])
+                    and not _always_succeeds(flat[index + 2:])):
+                issues.append(('warning', "相邻的无界量词可以匹配相同字符（如 \\s*\\s+），失败时回溯代价高"))
+        elif name == 'BRANCH':
+            for branch in av[1]:
+                _lint_items(branch, issues)
+        elif name == 'SUBPATTERN':
+            _lint_items(av[-1], issues)
+
+def lint_pattern(pattern):
+    """静态检查正则表达式，返回 [(级别, 说明)]，级别为 error 或 warning"""
+    issues = []
+    _lint_items(list(sre_parse.parse(pattern)), issues)
+    # 去掉重复的提示，保持顺序
+    return list(dict.fromkeys(issues))
+
+def _probe_pattern_worker(pattern, lines, budget, conn):
+    """在子进程中逐行计时匹配，超出预算时报告对应行"""
+    # 使用管道同步发送，回溯期间占用GIL也不影响已发出的消息
+    conn.send(('started', None))
+    compiled = re.compile(pattern)
+    for index, line in enumerate(lines):
+        start = time.perf_counter()
+        compiled.match(line)
+        elapsed = time.perf_counter() - start
+        if elapsed > budget:
+            conn.send(('slow', (index, elapsed)))
+            return
+    conn.send(('ok', None))
+
+def check_pattern_safety(pattern, sample_lines=(), budget=PATTERN_LINE_BUDGET, timeout=PATTERN_PROBE_TIMEOUT):
+    """检查用户编辑的正则表达式，不安全时抛出 PatternSafetyError
+
+    先做静态检查，存在有歧义的嵌套无界量词等错误时直接拒绝；然后在子进程中用文档里最长的
+    若干行和构造的最坏情况输入逐行计时，超出预算或整体超时同样拒绝。
+    子进程可以被强制终止，主界面不会因为回溯而卡死。
+    """
+    issues = lint_pattern(pattern)
+    errors = [message for level, message in issues if level == 'error']
+    if errors:
+        raise PatternSafetyError("\n".join(errors))
+    
+    lines = sorted(sample_lines, key=len, reverse=True)[:PATTERN_PROBE_LINES]
+    lines.extend(_ADVERSARIAL_LINES)
+    receiver, sender = multiprocessing.Pipe(duplex=False)
+    process = multiprocessing.Process(target=_probe_pattern_worker, args=(pattern, lines, budget, sender), daemon=True)
+    process.start()
+    status, detail = 'timeout', None
+    try:
+        # 子进程启动时间不计入预算
+        if receiver.poll(30) and receiver.recv()[0] == 'started' and receiver.poll(timeout):
+            status, detail = receiver.recv()
+    except EOFError:
+        pass
+    finally:
+        if process.is_alive():
+            process.terminate()
+        process.join()
+        receiver.close()
+    
+    warnings = "\n".join(message for level, message in issues if level == 'warning')
+    if status == 'slow':
+        index, elapsed = detail
+        sample = lines[index][:40]
+        raise PatternSafetyError(f"匹配单行耗时 {elapsed:.2f} 秒，超出预算 {budget} 秒（输入行：'{sample}...'）\n{warnings}".strip())
+    if status == 'timeout':
+        raise PatternSafetyError(f"匹配探测超过 {timeout} 秒仍未完成\n{warnings}".strip())
+    return issues
+
+class Outline(list):
+    """大纲行列表，附带与行一一对应的印刷页码和PDF页码（0 表示未知）
+
+    页码保存在平行的整型数组中，行本身仍是字符串列表，按行处理的代码不受影响。
+    增删行须通过 append_row/select，以保持数组与行对齐。
+    """
+    def __init__(self, rows=(), pages=None, pdf_pages=None):
+        super().__init__(rows)
+        self.pages = array('i', pages if pages is not None else [0] * len(self))
+        self.pdf_pages = array('i', pdf_pages if pdf_pages is not None else [0] * len(self))
+
+    def append_row(self, row, page=0, pdf_page=0):
+        self.append(row)
+        self.pages.append(page)
+        self.pdf_pages.append(pdf_page)
+
+    def select(self, indices):
+        """按下标取出若干行，页码随行一起取出"""
+        indices = list(indices)
+        return Outline([self[i] for i in indices],
+                       [self.pages[i] for i in indices],
+                       [self.pdf_pages[i] for i in indices])
+
+    def has_pages(self):
+        return any(self.pages) or any(self.pdf_pages)
+
+def _is_number_row(entry):
+    """大纲行的非空单元格是否全是数字（误匹配的单独页码）"""
+    return all(re.match(r'^\s*\d+\s*$', e) for e in entry if e.strip())
+
+class OutlineBuilder:
+    """按层级关系把匹配结果折叠为大纲行
+
+    当前行与上一次匹配的层级保存在对象上，可以分多次喂入（分块、分页），
+    结果与一次性处理全部匹配相同。
+    """
+    def __init__(self, max_depth):
+        self.max_depth = max_depth
+        self.outline = Outline()
+        self.current_entry = [""] * max_depth
+        self.current_pages = (0, 0)  # 当前行最后一个标题的印刷页码与PDF页码
+        self.last_matched_level = -1  # 记录上一次匹配的层级
+
+    def feed(self, matches):
+        for depth_idx, line, page, pdf_page in matches:
+            # 如果是更高层级或同级的新标题，保存当前行并创建新行
+            if depth_idx <= self.last_matched_level:
+                if any(self.current_entry):
+                    self.outline.append_row(self.current_entry[:], *self.current_pages)
+                self.current_entry = [""] * self.max_depth
+                # 保留更高层级的标题
+                for j in range(depth_idx):
+                    self.current_entry[j] = self.outline[-1][j] if self.outline else ""
+            
+            self.current_entry[depth_idx] = line
+            self.current_pages = (page, pdf_page)
+            self.last_matched_level = depth_idx
+
+    def finish(self):
+        # 确保最后一行也被添加
+        if any(self.current_entry):
+            self.outline.append_row(self.current_entry, *self.current_pages)
+        return self.outline
+
+CHINESE_NUMBER_CLASS = '[一二三四五六七八九十百千万零]'
+
+# 样本中编号记号在序列中对应的正则片段
+_SEQUENCE_TOKENS = {
+    # 中文数字，增加对"第"字的支持
+    'c': '(?:第?\\s*' + CHINESE_NUMBER_CLASS + '+\\s*[章节篇部分]?|' + CHINESE_NUMBER_CLASS + '+)',
+    # 数字，包括可能的空格
+    'n': '(?:\\s*\\d{1,3}\\s*)',
+    # 字母，包括可能的空格
+    'e': '\\s*[a-zA-Z]{1,3}\\s*',
+    # 罗马数字
+    'r': '[IVXLCDM]{1,4}',
+    # 中文点号
+    '·': '·\\s*',
+}
+
+# 括号包裹的编号
+_BRACKET_TOKENS = {
+    'c': CHINESE_NUMBER_CLASS + '+',
+    'n': '\\d{1,3}',
+    'e': '[a-zA-Z]{1,3}',
+    'r': '[IVXLCDM]{1,4}',  # 罗马数字(I, II, III, IV等)
+}
+
+def parse_sample(sample):
+    """把目录样本解析为语法树，正则由语法树生成
+
+    语法树为元组，第一项是样本形式：
+      ('chapter', 编号类型, 后缀)          第c章、第n节
+      ('bracket', 左括号, 编号类型)        (n)、（c）
+      ('bullet',)                          ·开头
+      ('sequence', 记号...)                c、 n.n 等，记号为编号类型或原样匹配的文字
+
+    连续的字母中含有 c/n/e/r 以外的字母时是原样匹配的文字（如 Section n.n 中的
+    Section），整段作为一个记号，其中的字母不当作编号类型。
+    """
+    # 处理"第X章/部分"这种特殊格式
+    m_special = re.match(r'^第(c+|n+)(.*)', sample)
+    if m_special:
+        type_seq, suffix = m_special.groups()
+        return ('chapter', type_seq[0], suffix)
+    # 优先支持括号包裹的c/n/e/cc/nn/ee
+    m_bracket = re.match(r'^(（+|\(+)(c+|n+|e+|r+)(）+|\)+)', sample)
+    if m_bracket:
+        left_bracket, type_seq, _ = m_bracket.groups()
+        return ('bracket', left_bracket[0], type_seq[0])
+    # 处理中文点号(·)开头的特殊格式
+    if sample.startswith('·'):
+        return ('bullet',)
+    tokens = []
+    for run in re.findall(r'[A-Za-z]+|.', sample, re.S):
+        if set(run) <= set('cner'):
+            tokens.extend(run)
+        else:
+            tokens.append(run)
+    return ('sequence',) + tuple(tokens)
+
+def sample_to_regex(tree, space_required=False):
+    """由样本语法树生成正则文本"""
+    form = tree[0]
+    if form == 'chapter':
+        _, type_char, suffix = tree
+        tail = re.escape(suffix) if suffix else r'[章节篇部分]?.*'
+        if type_char == 'c':
+            # 不再强制要求分隔符
+            return r'^第\s*' + CHINESE_NUMBER_CLASS + r'+\s*' + tail
+        # 使用非贪婪匹配来处理空格，不再强制要求分隔符
+        return r'^第\s*?\d{1,3}\s*' + tail
+    if form == 'bracket':
+        _, left_bracket, type_char = tree
+        if left_bracket == '（':
+            l_b, r_b = '（', '）'
+        else:
+            l_b, r_b = '\\(', '\\)'
+        return f'^{l_b}{_BRACKET_TOKENS[type_char]}{r_b}.*'
+    if form == 'bullet':
+        return r'^·\s*.*'
+    
+    tokens = tree[1:]
+    base_pattern = '^' + ''.join(_SEQUENCE_TOKENS.get(token) or re.escape(token) for token in tokens)
+    # 添加标题内容限制，不再强制要求分隔符
+    if tokens and space_required:
+        return base_pattern + r'\s+.*'
+    return base_pattern + r'.*'
+
+@lru_cache(maxsize=512)
+def compile_sample(sample, space_required=False):
+    """编译单个层级样本，返回 (正则, 编号类型, 编号位置)
+
+    结果按 (样本, 是否强制空格) 缓存，常用样本在切换配置、批量处理时不再重复编译。
+    冒号截断只影响标题清理，不影响生成的正则，因此不参与缓存键。
+    """
+    tree = parse_sample(sample)
+    pattern = sample_to_regex(tree, space_required)
+    logger.debug("样本 %r 语法树 %r -> %s", sample, tree, pattern)
+    # 决定序号的编号类型及位置，取语法树中最后一个编号，原样匹配的文字不计
+    if tree[0] == 'sequence':
+        kinds = [token for token in tree[1:] if token in ('c', 'n', 'e', 'r')]
+    else:
+        kinds = {'chapter': tree[1:2], 'bracket': tree[2:3]}.get(tree[0], [])
+    kind = kinds[-1] if kinds else None
+    return re.compile(pattern), kind, max(kinds.count('n') - 1, 0)
+
+def build_level_configs(samples, space_required, normalize=None):
+    """根据目录样本生成各层级的匹配配置，按层级从深到浅排列"""
+    level_configs = []
+    for depth, sample in enumerate(samples, 1):
+        # 样本与待匹配的行使用同一套归一化，生成的模式只需处理半角形式
+        if normalize:
+            sample = normalize(sample)
+        pattern, kind, ordinal_position = compile_sample(sample, bool(space_required[depth-1]))
+        logger.debug("Level %d pattern: %s", depth, pattern.pattern)
+        level_configs.append({
+            'depth': depth,
+            'pattern': pattern,
+            'max_depth': len(samples),
+            'kind': kind,
+            'ordinal_position': ordinal_position
+        })
+    level_configs.sort(key=lambda x: -x['depth'])
+    return level_configs
+
+# 推断样本时识别的行首编号形状
+_CHAPTER_SHAPE = re.compile(r'^第\s*(?:(' + CHINESE_NUMBER_CLASS + r'+)|(\d{1,3}))\s*([章节篇部])')
+_BRACKET_SHAPE = re.compile(r'^\(\s*(?:(' + CHINESE_NUMBER_CLASS + r'+)|(\d{1,2})|([IVX]{1,4})|([a-zA-Z]))\s*\)')
+_CHINESE_SHAPE = re.compile(r'^(' + CHINESE_NUMBER_CLASS + r'+)([、.])')
+# 纯数字编号后面要么有分隔符，要么有空白，且紧跟标题文字，排除"2007年"、"1, 张三"之类的正文
+_DOTTED_SHAPE = re.compile(r'^(\d{1,2}(?:\.\d{1,2}){0,4})(?:([.、)])\s*|(\s+))(?=[一-鿿A-Za-z“"《])')
+_LETTER_SHAPE = re.compile(r'^([IVX]{1,4}|[A-Za-z])([.、)])\s')
+
+_FIRST_ORDINALS = {'1', '一', 'I', 'A', 'a'}
+
+def numbering_shape(line):
+    """识别行首编号的形状，返回 (样本, 编号值, 编号后是否有空白)，不以编号开头时返回 None"""
+    m = _CHAPTER_SHAPE.match(line)
+    if m:
+        return '第' + ('c' if m.group(1) else 'n') + m.group(3), m.group(1) or m.group(2), True
+    m = _BRACKET_SHAPE.match(line)
+    if m:
+        kind = 'cnre'[next(i for i, group in enumerate(m.groups()) if group)]
+        return f'({kind})', m.group(0), True
+    m = _CHINESE_SHAPE.match(line)
+    if m:
+        return 'c' + m.group(2), m.group(1), True
+    m = _DOTTED_SHAPE.match(line)
+    if m:
+        number, separator, space = m.groups()
+        return 'n' + number.count('.') * '.n' + (separator or ''), number, bool(space)
+    m = _LETTER_SHAPE.match(line)
+    if m:
+        kind = 'r' if len(m.group(1)) > 1 or m.group(1) in 'IVX' else 'e'
+        return kind + m.group(2), m.group(1), True
+    return None
+
+def _shape_rank(sample):
+    """常见的层级先后：第X章 > 一、 > (一) > I. > 1. > 1.1 > a) > (1)"""
+    if sample.startswith('第'):
+        return 0
+    if sample[0] in 'cr':
+        return 1 if sample[0] == 'c' else 3
+    if sample.startswith('(c'):
+        return 2
+    if sample[0] == 'n':
+        return 3 + sample.count('n')
+    if sample[0] == 'e':
+        return 10
+    return 11 if sample.startswith('(n') else 12
+
+def infer_samples(lines, max_levels=4, min_count=2, normalize=None):
+    """根据文档自身的编号推断层级样本，返回 (样本列表, 是否强制空格列表)，可直接交给 build_configs
+
+    单次扫描所有行，按编号形状统计出现次数、不同编号值的个数和编号后带空格的次数。
+    页眉页脚等重复出现的行编号值不变，要求至少出现两个不同的编号值以排除它们。
+    """
+    counts = {}  # 样本 -> [出现次数, 编号后有空格的次数, 首次出现的行号, 出现过的编号值, 首个编号是否为1]
+    for index, line in enumerate(lines):
+        line = line.strip()
+        if not line or PAGE_MARKER_PATTERN.match(line):
+            continue
+        if normalize:
+            line = normalize(line)
+        shape = numbering_shape(line)
+        if shape is None:
+            continue
+        sample, value, spaced = shape
+        entry = counts.get(sample)
+        if entry is None:
+            entry = counts[sample] = [0, 0, index, set(), value.strip('()').rsplit('.', 1)[-1] in _FIRST_ORDINALS]
+        entry[0] += 1
+        entry[1] += spaced
+        entry[3].add(value)
+    
+    candidates = [(sample, entry) for sample, entry in counts.items()
+                  if entry[0] >= min_count and len(entry[3]) >= 2]
+    # 出现最多的若干种形状作为层级，再按常见的层级先后排序；
+    # 同一级别的形状优先从1开始编号的，其次按首次出现位置
+    candidates.sort(key=lambda item: (-len(item[1][3]), -item[1][0], item[1][2]))
+    selected = sorted(candidates[:max_levels], key=lambda item: (_shape_rank(item[0]), not item[1][4], item[1][2]))
+    for sample, entry in selected:
+        logger.debug("推断样本 %s：出现 %d 次，%d 个不同编号", sample, entry[0], len(entry[3]))
+    
+    samples = [sample for sample, _ in selected]
+    # 以数字结尾的样本若大多带空格则强制空格，避免匹配"2025年"这样的正文
+    space_required = [sample[-1] == 'n' and entry[1] * 2 > entry[0] for sample, entry in selected]
+    return samples, space_required
+
+@dataclass(frozen=True)
+class ExtractionProfile:
+    """一次提取所需的全部设置（样本、选项、屏蔽词、OCR），不可变，可在进程间传递
+
+    序列化时只带样本字符串和选项，编译好的层级配置在每个进程里按需生成并缓存，
+    同一个配置对象在同一进程内只编译一次。
+    """
+    samples: tuple = ()
+    space_required: tuple = ()
+    patterns: tuple = ()  # 手动编辑过的正则，(层级, 正则文本)
+    remove_page_numbers: bool = True
+    colon_truncate: bool = True
+    blocked_keywords: frozenset = frozenset()
+    normalize_text: bool = True
+    sequence_filter: bool = False
+    remove_headers_footers: bool = True
+    remove_duplicate_pages: bool = True
+    deduplicate_rows: bool = False
+    use_links: bool = False
+    geometry_pages: bool = False
+    sequence_max_gap: int = 2
+    max_lookahead: int = 3
+    force_ocr: bool = False
+    tesseract_cmd: str = ''
+    ocr_lang: str = 'chi_sim+eng'
+
+    def __post_init__(self):
+        # 从列表、集合等构造时统一转成可哈希的类型
+        object.__setattr__(self, 'samples', tuple(self.samples))
+        object.__setattr__(self, 'space_required', tuple(bool(flag) for flag in self.space_required))
+        object.__setattr__(self, 'patterns', tuple(sorted((int(depth), pattern) for depth, pattern in self.patterns)))
+        object.__setattr__(self, 'blocked_keywords', frozenset(self.blocked_keywords))
+        # 每个样本对应一个空格匹配标志，数量不一致时后续按下标取值会越界
+        if len(self.space_required) != len(self.samples):
+            raise ValueError(f"样本数（{len(self.samples)}）与空格匹配设置数（{len(self.space_required)}）不一致")
+
+    def text_key(self):
+        """影响文本提取结果的设置，相同时已提取的文本可以直接复用"""
+        return (self.force_ocr, self.geometry_pages, self.tesseract_cmd, self.ocr_lang)
+
+    @property
+    def level_configs(self):
+        """编译好的层级配置（每个进程缓存一份，不要修改其中的内容）"""
+        return _compile_profile(self)
+
+    def to_dict(self):
+        data = {f.name: getattr(self, f.name) for f in fields(self)}
+        data['samples'] = list(self.samples)
+        data['space_required'] = list(self.space_required)
+        data['patterns'] = [list(item) for item in self.patterns]
+        data['blocked_keywords'] = sorted(self.blocked_keywords)
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        # 忽略不认识的字段，旧版本或新版本保存的配置文件都能加载
+        names = {f.name for f in fields(cls)}
+        return cls(**{key: value for key, value in data.items() if key in names})
+
+    def save(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+
+    @classmethod
+    def load(cls, path):
+        """从文件加载配置，内容不完整时抛出 ValueError"""
+        with open(path, encoding='utf-8') as f:
+            return cls.from_dict(json.load(f))
+
+@lru_cache(maxsize=64)
+def _compile_profile(profile):
+    normalizer = TextNormalizer()
+    normalize = normalizer.normalize if profile.normalize_text else None
+    level_configs = build_level_configs(profile.samples, profile.space_required, normalize)
+    overrides = dict(profile.patterns)
+    for config in level_configs:
+        if config['depth'] in overrides:
+            pattern = overrides[config['depth']]
+            config['pattern'] = re.compile(normalizer.normalize_pattern(pattern) if normalize else pattern)
+    return tuple(level_configs)
+
+RUNNING_LINE_BAND = 3  # 每页顶部、底部各取几行作为页眉页脚候选
+RUNNING_LINE_THRESHOLD = 0.5  # 出现在超过该比例的页面上即视为页眉页脚
+RUNNING_LINE_MIN_PAGES = 3  # 页数太少时无法判断，不做处理
+
+def page_spans(lines):
+    """各页的 (PDF页码, 内容起始下标, 内容结束下标)，不含分页标记本身"""
+    spans = []
+    number = start = None
+    for index, line in enumerate(lines):
+        m = PAGE_MARKER_PATTERN.match(line)
+        if m:
+            if start is not None:
+                spans.append((number, start, index))
+            number, start = int(m.group(1)), index + 1
+    if start is not None:
+        spans.append((number, start, len(lines)))
+    return spans
+
+# 页眉页脚中单独成行的页码："12"、"- 12 -"、"第12页"
+FOLIO_PATTERN = re.compile(r'^(?:第\s*)?[-—–]?\s*(\d{1,4})\s*[-—–]?(?:\s*页)?$')
+
+def estimate_page_offset(lines, band=RUNNING_LINE_BAND, min_votes=3):
+    """根据页眉页脚中的页码估计PDF页码与印刷页码之差，PDF页码 = 印刷页码 + 偏移
+
+    每页顶部、底部的单独页码各投一票"PDF页码 - 印刷页码"，取票数最多的偏移；
+    票数不足（没有印刷页码的文档）时返回 None。
+    """
+    votes = {}
+    for number, page_start, page_end in page_spans(lines):
+        offsets = set()
+        for index in range(page_start, page_end):
+            if page_start + band <= index < page_end - band:
+                continue
+            m = FOLIO_PATTERN.match(lines[index])
+            if m:
+                offsets.add(number - int(m.group(1)))
+        for offset in offsets:
+            votes[offset] = votes.get(offset, 0) + 1
+    if not votes:
+        return None
+    offset, count = max(votes.items(), key=lambda item: (item[1], -abs(item[0])))
+    return offset if count >= min_votes else None
+
+def remove_running_lines(lines, band=RUNNING_LINE_BAND, threshold=RUNNING_LINE_THRESHOLD, normalize=None,
+                         is_entry=None):
+    """去除每页重复出现的页眉、页脚和页码，返回 (剩余的行, 去除的行数)
+
+    先扫描一遍，按"顶部/底部 + 归一化后的行内容"统计各行出现在多少页上，
+    数字统一替换为#，这样逐页变化的页码、"第N页"也能归为同一行；再扫描一遍
+    去掉出现页数超过阈值的页眉页脚行。只依赖分页标记，PyMuPDF 提取的文本和
+    OCR 结果都适用。
+
+    is_entry 判断一行是否为标题或目录行。紧跟在这种行后面的单独页码是该条目的
+    页码（拼接阶段会接到标题后），虽然和页脚页码同形也不去除。
+    """
+    pages = [(page_start, page_end) for _, page_start, page_end in page_spans(lines)]
+    if len(pages) < RUNNING_LINE_MIN_PAGES:
+        return lines, 0
+    
+    def band_keys(page_start, page_end):
+        # 行数不超过两倍带宽的短页上，同一行可能同时位于顶部和底部，两个键都要给出
+        for index in range(page_start, page_end):
+            positions = []
+            if index < page_start + band:
+                positions.append('top')
+            if index >= page_end - band:
+                positions.append('bottom')
+            if not positions:
+                continue
+            line = normalize(lines[index]) if normalize else lines[index]
+            text = re.sub(r'\d+', '#', "".join(line.split()))
+            for position in positions:
+                yield index, (position, text)
+    
+    counts = {}
+    for page_start, page_end in pages:
+        # 同一页内重复的行只计一次
+        for key in {key for _, key in band_keys(page_start, page_end)}:
+            counts[key] = counts.get(key, 0) + 1
+    
+    limit = len(pages) * threshold
+    drop = set()
+    for page_start, page_end in pages:
+        for index, key in band_keys(page_start, page_end):
+            if counts[key] > limit:
+                if (is_entry is not None and index > page_start and PAGE_ONLY_PATTERN.match(lines[index])
+                        and is_entry(lines[index - 1])):
+                    continue
+                drop.add(index)
+    if not drop:
+        return lines, 0
+    logger.debug("去除页眉页脚 %d 行", len(drop))
+    return [line for index, line in enumerate(lines) if index not in drop], len(drop)
+
+def remove_duplicate_pages(lines, min_lines=2):
+    """去除内容与前面某页完全相同的页面（重复印刷的目录页等），返回 (剩余的行, 去除的页数)
+
+    每页内容行组成的元组放入哈希集合，一次扫描即可判断是否重复；分页标记本身保留。
+    应在去除页眉页脚之后调用，否则逐页变化的页码会让相同的页面内容不同。
+    """
+    seen = set()
+    result = []
+    page = []
+    removed = 0
+    
+    def flush():
+        nonlocal removed
+        key = tuple(page)
+        if len(page) >= min_lines and key in seen:
+            removed += 1
+        else:
+            seen.add(key)
+            result.extend(page)
+    
+    for line in lines:
+        if PAGE_MARKER_PATTERN.match(line):
+            flush()
+            result.append(line)
+            page = []
+        else:
+            page.append(line)
+    flush()
+    if removed:
+        logger.debug("去除重复页面 %d 页", removed)
+    return result, removed
+
+def _row_key(row, normalize=None):
+    """大纲行的比较键：归一化字符，去掉引导点、页码和空白"""
+    key = []
+    for cell in row:
+        if normalize:
+            cell = normalize(cell)
+        cell = TRAILING_PAGE_PATTERN.sub('', cell)
+        key.append(re.sub(r'\.{3,}|…+|\s+', '', cell))
+    return tuple(key)
+
+def deduplicate_rows(outline, normalize=None):
+    """去除与前面某行内容相同的大纲行（目录与正文标题、简目与详目重复），只保留第一次出现的行"""
+    seen = set()
+    kept = []
+    for index, row in enumerate(outline):
+        key = _row_key(row, normalize)
+        if key not in seen:
+            seen.add(key)
+            kept.append(index)
+    if isinstance(outline, Outline):
+        return outline.select(kept)
+    return [outline[index] for index in kept]
+
+PAGE_COLUMN_HEADERS = ["页码", "PDF页码"]  # 目录层级列之后的页码列
+
+# 行数达到该值才启用并行解析，小文档进程启动开销不划算。
+# 取值依据：串行解析约 15 万行/秒（生成的 10 万行目录约 0.65 秒），而每个子进程启动并
+# 导入本程序（PyQt5、PyMuPDF、pdfplumber）约需 0.26 秒，打包后的 Windows 程序以 spawn
+# 方式启动更慢，再加上传送文本的开销；10 万行以下并行节省的时间抵不过这些开销。
+PARALLEL_PARSE_MIN_LINES = 100000
+
+def split_page_chunks(lines, chunk_count):
+    """按分页标记把行列表切成大致等长的若干块，块边界总是落在分页标记上"""
+    target = max(len(lines) // max(chunk_count, 1), 1)
+    chunks = []
+    start = 0
+    for index, line in enumerate(lines):
+        if index - start >= target and PAGE_MARKER_PATTERN.match(line):
+            chunks.append(lines[start:index])
+            start = index
+    chunks.append(lines[start:])
+    return chunks
+
+def _match_chunk(profile, lines):
+    """子进程中执行：拼接并匹配一块文本，返回匹配结果和统计"""
+    extractor = OutlineExtractor.from_profile(profile)
+    matches = extractor.match_lines(lines)
+    return matches, extractor.stats
+
+# 配置比较时每个进程共用的文本，由进程初始化函数设置一次
+_sweep_lines = []
+_sweep_shapes = {}
+_sweep_normalize = TextNormalizer().normalize
+
+def _init_sweep_worker(text):
+    """每个进程只接收一次文本，切分好的行与编号形状统计供该进程内的所有候选配置共用"""
+    global _sweep_lines, _sweep_shapes
+    _sweep_lines = [line.strip() for line in text.split("\n") if line.strip()]
+    normalize = _sweep_normalize
+    _sweep_shapes = {}
+    for line in _sweep_lines:
+        shape = numbering_shape(normalize(line))
+        if shape:
+            _sweep_shapes[shape[0]] = _sweep_shapes.get(shape[0], 0) + 1
+
+def score_matches(matches, consistent, samples, shapes, max_depth):
+    """给一个候选配置的匹配结果打分
+
+    coverage：文档中编号开头的行里，编号形状属于候选样本的比例
+    consistency：序号连续性过滤后保留下来的比例
+    balance：各层级匹配数量的均衡程度（归一化的熵），只有一层时为1
+    """
+    if not matches:
+        return {'coverage': 0.0, 'consistency': 0.0, 'balance': 0.0, 'score': 0.0}
+    coverage = sum(shapes.get(sample, 0) for sample in set(samples)) / max(sum(shapes.values()), 1)
+    consistency = len(consistent) / len(matches)
+    depth_counts = {}
+    for depth_idx, *_ in matches:
+        depth_counts[depth_idx] = depth_counts.get(depth_idx, 0) + 1
+    if max_depth > 1:
+        entropy = -sum(n / len(matches) * math.log(n / len(matches)) for n in depth_counts.values())
+        balance = entropy / math.log(max_depth)
+    else:
+        balance = 1.0
+    score = 0.4 * coverage + 0.4 * consistency + 0.2 * balance
+    return {'coverage': round(coverage, 4), 'consistency': round(consistency, 4),
+            'balance': round(balance, 4), 'score': round(score, 4)}
+
+def _evaluate_profile(profile):
+    """子进程中执行：用一个候选配置解析共用的文本，返回评分、大纲和统计"""
+    extractor = OutlineExtractor.from_profile(profile)
+    lines = extractor.filter_lines(_sweep_lines)
+    matches = extractor.match_lines(lines)
+    consistent = extractor.filter_sequence(matches)
+    max_depth = len(extractor.level_configs)
+    outline = extractor._finish_outline(matches, max_depth)
+    row = {'samples': list(profile.samples), 'matches': len(matches), 'rows': len(outline)}
+    normalize = extractor.normalizer.normalize if extractor.normalize_text else (lambda text: text)
+    samples = [normalize(sample) for sample in profile.samples]
+    row.update(score_matches(matches, consistent, samples, _sweep_shapes, max_depth))
+    return row, outline, extractor.stats
+
+def sweep_profiles(text, profiles, workers=None, stats=None):
+    """用多个候选配置解析同一份文本并打分，返回 (得分最高的大纲, 按得分排序的评分表)
+
+    文本通过进程池的初始化函数每个进程只传一次，各候选配置只传配置对象本身。
+    """
+    profiles = list(profiles)
+    if not profiles:
+        return [], []
+    workers = min(workers or os.cpu_count() or 1, len(profiles))
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_sweep_worker, initargs=(text,)) as executor:
+            results = list(executor.map(_evaluate_profile, profiles))
+    else:
+        _init_sweep_worker(text)
+        try:
+            results = [_evaluate_profile(profile) for profile in profiles]
+        finally:
+            _init_sweep_worker('')
+    
+    table = []
+    outlines = []
+    for index, (row, outline, profile_stats) in enumerate(results):
+        row['index'] = index
+        table.append(row)
+        outlines.append(outline)
+        if stats is not None:
+            stats.merge(profile_stats)
+    if stats is not None:
+        stats.count('parse', 'candidates', len(profiles))
+    table.sort(key=lambda row: (-row['score'], row['index']))
+    for row in table:
+        logger.info("候选配置 %d %s：得分 %.3f（覆盖 %.3f，连续 %.3f，均衡 %.3f）", row['index'], row['samples'],
+                    row['score'], row['coverage'], row['consistency'], row['balance'])
+    return outlines[table[0]['index']], table
+
 class OutlineExtractor:
     def __init__(self):
         self.level_configs = []
@@ -65,6 +1303,68 @@ class OutlineExtractor:
         self.remove_page_numbers = True  # 新增：控制是否移除页码
         self.colon_truncate = True  # 新增：控制是否在冒号处截断
         self.blocked_keywords = set()  # 新增：存储需要屏蔽的关键词
+        self.stats = Instrumentation()  # 各阶段耗时与计数
+        self.max_lookahead = 3  # 跨行标题拼接时最多向后预读的行数
+        self.normalize_text = True  # 匹配前做字符归一化
+        self.sequence_filter = False  # 是否启用序号连续性过滤
+        self.remove_headers_footers = True  # 解析前去除每页重复的页眉页脚
+        self.remove_duplicate_pages = True  # 解析前去除内容完全重复的页面
+        self.deduplicate_rows = False  # 去除内容重复的大纲行
+        self.page_offset = None  # 最近一次解析估计的 PDF页码 - 印刷页码
+        self.use_links = False  # 文档有可点击目录时按目录链接解析
+        self.geometry_pages = False  # 页码由文本提取阶段按文字位置识别，清理标题时不再按文本规则猜测
+        self.sequence_max_gap = 2  # 连续编号链允许的最大跳号（容忍个别漏识别）
+        self.parallel_workers = os.cpu_count() or 1  # 大文档分块并行解析的进程数
+        self.normalizer = TextNormalizer()
+        self.samples = []
+        self.pattern_overrides = {}  # 手动编辑过的正则，层级 -> 正则文本
+    
+    @classmethod
+    def from_profile(cls, profile):
+        extractor = cls()
+        extractor.apply_profile(profile)
+        return extractor
+    
+    def apply_profile(self, profile):
+        """按配置对象设置提取选项，层级配置直接取自配置对象的编译缓存"""
+        self.samples = list(profile.samples)
+        self.space_required = list(profile.space_required)
+        self.remove_page_numbers = profile.remove_page_numbers
+        self.colon_truncate = profile.colon_truncate
+        self.blocked_keywords = set(profile.blocked_keywords)
+        self.normalize_text = profile.normalize_text
+        self.sequence_filter = profile.sequence_filter
+        self.remove_headers_footers = profile.remove_headers_footers
+        self.remove_duplicate_pages = profile.remove_duplicate_pages
+        self.deduplicate_rows = profile.deduplicate_rows
+        self.use_links = profile.use_links
+        self.geometry_pages = profile.geometry_pages
+        self.sequence_max_gap = profile.sequence_max_gap
+        self.max_lookahead = profile.max_lookahead
+        self.pattern_overrides = dict(profile.patterns)
+        # 复制一层，界面里编辑正则时不会改到缓存中的配置
+        self.level_configs = [dict(config) for config in profile.level_configs]
+    
+    def to_profile(self, **options):
+        """把当前设置固化为配置对象，options 用于补充OCR等提取器之外的设置"""
+        profile = ExtractionProfile(
+            samples=self.samples,
+            space_required=self.space_required,
+            patterns=self.pattern_overrides.items(),
+            remove_page_numbers=self.remove_page_numbers,
+            colon_truncate=self.colon_truncate,
+            blocked_keywords=self.blocked_keywords,
+            normalize_text=self.normalize_text,
+            sequence_filter=self.sequence_filter,
+            remove_headers_footers=self.remove_headers_footers,
+            remove_duplicate_pages=self.remove_duplicate_pages,
+            deduplicate_rows=self.deduplicate_rows,
+            use_links=self.use_links,
+            geometry_pages=self.geometry_pages,
+            sequence_max_gap=self.sequence_max_gap,
+            max_lookahead=self.max_lookahead,
+        )
+        return replace(profile, **options) if options else profile
     
     def add_blocked_keyword(self, keyword):
         """添加需要屏蔽的关键词"""
@@ -81,124 +1381,74 @@ class OutlineExtractor:
         self.blocked_keywords.clear()
     
     def build_configs(self, samples, space_required):
-        self.level_configs = []
+        self.samples = list(samples)
         self.space_required = space_required
-        SEPARATORS = '-、.．()（）:：;；·'  # 添加中文点号到分隔符列表
-        # 修改分隔符列表，移除顿号
-        CONTENT_SEPARATORS = ';；。'  # 基础分隔符
-        if self.colon_truncate:
-            CONTENT_SEPARATORS += '：:'  # 如果启用冒号截断，添加冒号
-        
-        for depth, sample in enumerate(samples, 1):
-            pattern = ''
-            
-            # 处理"第X章/部分"这种特殊格式
-            m_special = re.match(r'^第(c+|n+)(.*)', sample)
-            if m_special:
-                type_seq, suffix = m_special.groups()
-                if type_seq[0] == 'c':
-                    # 修改正则表达式，不再强制要求分隔符
-                    pattern = r'^第\s*[一二三四五六七八九十百千万]+\s*' + (re.escape(suffix) if suffix else r'[章节篇部分]?.*')
-                elif type_seq[0] == 'n':
-                    # 使用非贪婪匹配来处理空格，不再强制要求分隔符
-                    pattern = r'^第\s*?\d{1,3}\s*' + (re.escape(suffix) if suffix else r'[章节篇部分]?.*')
-            
-            # 优先支持括号包裹的c/n/e/cc/nn/ee
-            elif re.match(r'^(（+|\(+)(c+|n+|e+|r+)(）+|\)+)', sample):
-                m_bracket = re.match(r'^(（+|\(+)(c+|n+|e+|r+)(）+|\)+)', sample)
-                left_bracket, type_seq, right_bracket = m_bracket.groups()
-                if left_bracket[0] in '（':
-                    l_b = '（'
-                    r_b = '）'
-                else:
-                    l_b = '\\('
-                    r_b = '\\)'
-                
-                if type_seq[0] == 'c':
-                    # 修改中文数字匹配模式，不再强制要求分隔符
-                    pattern = f'^{l_b}[一二三四五六七八九十百千万]+{r_b}.*'
-                elif type_seq[0] == 'n':
-                    pattern = f'^{l_b}\\d{{1,3}}{r_b}.*'
-                elif type_seq[0] == 'e':
-                    pattern = f'^{l_b}[a-zA-Z]{{1,3}}{r_b}.*'
-                elif type_seq[0] == 'r':
-                    # 支持罗马数字(I, II, III, IV等)
-                    pattern = f'^{l_b}[IVXLCDM]{{1,4}}{r_b}.*'
-            
-            # 处理中文点号(·)开头的特殊格式
-            elif sample.startswith('·'):
-                pattern = r'^·\s*.*'
-            
-            else:
-                # 处理其他格式
-                parts = []
-                i = 0
-                while i < len(sample):
-                    if sample[i] == 'c':
-                        # 修改中文数字匹配模式，增加对"第"字的支持
-                        parts.append('(?:第?\\s*[一二三四五六七八九十百千万]+\\s*[章节篇部分]?|[一二三四五六七八九十百千万]+)')
-                        i += 1
-                    elif sample[i] == 'n':
-                        # 扩展数字匹配，包括可能的空格
-                        parts.append('(?:\\s*\\d{1,3}\\s*)')
-                        i += 1
-                    elif sample[i] == 'e':
-                        # 扩展字母匹配，包括可能的空格
-                        parts.append('\\s*[a-zA-Z]{1,3}\\s*')
-                        i += 1
-                    elif sample[i] == 'r':
-                        # 支持罗马数字
-                        parts.append('[IVXLCDM]{1,4}')
-                        i += 1
-                    elif sample[i] == '·':
-                        # 特殊处理中文点号
-                        parts.append('·\\s*')
-                        i += 1
-                    elif sample[i] in SEPARATORS:
-                        parts.append(re.escape(sample[i]))
-                        i += 1
-                    else:
-                        parts.append(re.escape(sample[i]))
-                        i += 1
-                
-                if parts:
-                    base_pattern = '^' + ''.join(parts)
-                    # 添加标题内容限制，不再强制要求分隔符
-                    if space_required[depth-1]:
-                        pattern = base_pattern + r'\s+.*'
-                    else:
-                        pattern = base_pattern + r'.*'
-                else:
-                    pattern = '^' + re.escape(sample) + r'.*'
-
-            print(f"Level {depth} pattern: {pattern}")
-            self.level_configs.append({
-                'depth': depth,
-                'pattern': re.compile(pattern),
-                'max_depth': len(samples)
-            })
-        self.level_configs.sort(key=lambda x: -x['depth'])
+        self.pattern_overrides = {}  # 重新生成配置后，手动修改的正则失效
+        normalize = self.normalizer.normalize if self.normalize_text else None
+        self.level_configs = build_level_configs(samples, space_required, normalize)
+    
+    def override_pattern(self, depth, compiled):
+        """用手动编辑的正则替换某一层级的匹配模式"""
+        for config in self.level_configs:
+            if config['depth'] == depth:
+                config['pattern'] = compiled
+        self.pattern_overrides[depth] = compiled.pattern
     
     def clean_title(self, title):
         """清理标题，移除页码和多余点号"""
+        return self.clean_title_page(title)[0]
+    
+    def clean_title_page(self, title):
+        """清理标题，并在移除页码的同一步中取出页码，返回 (标题, 页码)，没有页码时为0
+
+        不移除页码时标题保持原样，页码照样取出。
+        """
         if not title:
-            return title
-            
-        if not self.remove_page_numbers:
-            return title
+            return title, 0
             
-        # 保存原始标题以便调试
+        start = time.perf_counter()
+        try:
+            cleaned, page = self._clean_title_page(title)
+        finally:
+            # 各提前返回的分支也计入清理阶段
+            self.stats.add_time('clean', time.perf_counter() - start)
+        
+        # 如果标题发生变化，记录调试信息
+        self.stats.count('clean', 'titles')
+        if cleaned != title:
+            self.stats.count('clean', 'changed')
+            logger.debug("清理标题: '%s' -> '%s'", title, cleaned)
+        return cleaned, page
+    
+    def _clean_title_page(self, title):
+        # 保存原始标题
         original_title = title
+        page = 0
         
         # 首先移除末尾的点号序列
-        title = re.sub(r'\.{3,}\s*$', '', title)
+        title = _TRAILING_DOTS_PATTERN.sub('', title)
         
-        # 处理标题后面跟着的页码 - 多种模式，但更保守一些
-        # 模式1: 标题...数字  (如 "1.1 反汇编理论..........2")
-        title = re.sub(r'\.{3,}\s*\d{1,3}\s*$', '', title)
+        # 按位置识别出的页码最可靠；启用位置识别时不再按文本规则猜测，避免误删标题里的数字
+        m = _GEOMETRY_PAGE_PATTERN.search(title)
+        if m:
+            page = int(m.group(1))
+            title = title[:m.start()].rstrip()
+        elif not self.geometry_pages:
+            # 处理标题后面跟着的页码 - 多种模式，但更保守一些
+            # 模式1: 标题...数字  (如 "1.1 反汇编理论..........2")
+            m = _LEADER_PAGE_PATTERN.search(title)
+            if m:
+                page = int(m.group(1))
+                title = title[:m.start()]
+            
+            # 模式2: 标题  数字  (如 "2.1 分类工具  11") - 至少2个空格后跟1-3位数字
+            m = _SPACED_PAGE_PATTERN.search(title)
+            if m:
+                page = page or int(m.group(1))
+                title = title[:m.start()]
         
-        # 模式2: 标题  数字  (如 "2.1 分类工具  11") - 至少2个空格后跟1-3位数字
-        title = re.sub(r'\s{2,}\d{1,3}\s*$', '', title)
+        if not self.remove_page_numbers:
+            return original_title.replace(GEOMETRY_PAGE_SEPARATOR, '  '), page
         
         # 在冒号处截断（如果启用了该功能）
         if self.colon_truncate:
@@ -215,244 +1465,1289 @@ class OutlineExtractor:
         if self.blocked_keywords:
             # 如果整个标题都是屏蔽关键词，返回空字符串
             if title.strip() in self.blocked_keywords:
-                return ""
+                return "", page
             # 移除标题中的屏蔽关键词
             for keyword in self.blocked_keywords:
                 title = title.replace(keyword, "")
             # 清理可能留下的多余空格
             title = " ".join(title.split())
         
-        # 如果标题发生变化，打印调试信息
-        if title != original_title:
-            print(f"清理标题: '{original_title}' -> '{title}'")
-        
-        return title.strip()
+        return title.strip(), page
     
     def parse_text(self, text):
-        lines = [line.strip() for line in text.split("\n") if line.strip()]
+        with self.stats.stage('parse'):
+            return self._parse_text(text)
+
+    def _parse_text(self, text):
+        lines = self.prepare_lines(text)
+        if self.parallel_workers > 1 and len(lines) >= PARALLEL_PARSE_MIN_LINES:
+            chunks = split_page_chunks(lines, self.parallel_workers * 4)
+            if len(chunks) > 1:
+                return self._parse_chunks_parallel(lines, chunks)
         max_depth = len(self.level_configs)
-        outline = []
-        current_entry = [""] * max_depth
-        last_matched_level = -1  # 记录上一次匹配的层级
+        self.stats.count('parse', 'lines', len(lines))
         
         # 调试信息
-        print(f"\n=== 正在解析 {len(lines)} 行文本 ===")
-        print(f"配置的标题格式数量: {len(self.level_configs)}")
-        for cfg in self.level_configs:
-            print(f"层级 {cfg['depth']} 模式: {cfg['pattern'].pattern}")
-        
-        # 打印原始行内容
-        print("\n=== 原始行内容 ===")
-        for i, line in enumerate(lines):
-            print(f"行 {i+1}: '{line}'")
-        print("=== 原始行内容结束 ===\n")
-        
-        i = 0
-        match_count = 0
-        while i < len(lines):
-            line = lines[i]
-            
-            # 检查是否包含屏蔽关键词，如果包含则跳过此行
-            if self.blocked_keywords and any(keyword in line for keyword in self.blocked_keywords):
-                i += 1
-                continue
-                
-            matched = False
-            matched_config = None
-            
-            # 预处理跨行标题：检测并合并可能的标题行
-            # 特别检测三级目录格式 n-n-n
-            if re.match(r'^\s*\d+\s*-\s*\d+\s*-\s*\d+\s*$', line) and i+1 < len(lines):
-                # 这看起来像是三级目录的编号，但缺少内容部分，尝试合并下一行
-                next_line = lines[i+1]
-                # 检查下一行是否也是编号行
-                next_is_number = False
-                for cfg in self.level_configs:
-                    if cfg.get('pattern').match(next_line):
-                        next_is_number = True
-                        break
-                
-                # 如果下一行不是编号，则合并
-                if not next_is_number:
-                    print(f"检测到跨行三级标题: '{line}' + '{next_line}'")
-                    line = f"{line} {next_line}"
-                    i += 1  # 跳过已合并的下一行
+        logger.info("正在解析 %d 行文本，配置的标题格式数量: %d", len(lines), len(self.level_configs))
+        if logger.isEnabledFor(logging.DEBUG):
+            for cfg in self.level_configs:
+                logger.debug("层级 %d 模式: %s", cfg['depth'], cfg['pattern'].pattern)
+            # 原始行内容只在调试级别输出，避免整本书扫描时大量控制台写入
+            for i, line in enumerate(lines):
+                logger.debug("行 %d: '%s'", i + 1, line)
+        
+        matches = self.match_lines(lines)
+        return self._finish_outline(matches, max_depth)
+
+    def prepare_lines(self, text):
+        """切分文本为去除首尾空白的非空行，按需去除页眉页脚"""
+        return self.filter_lines([line.strip() for line in text.split("\n") if line.strip()])
+
+    def filter_lines(self, lines):
+        """估计页码偏移，再去除页眉页脚与重复页面（页码偏移依赖页脚中的页码，须在去除前估计）"""
+        self.page_offset = estimate_page_offset(lines)
+        if self.remove_headers_footers:
+            normalize = self.normalizer.normalize if self.normalize_text else None
+            classify = LineAssembler(self.level_configs, normalize=normalize).classify
             
-            # 也检测可能的二级目录格式 n-n
-            elif re.match(r'^\s*\d+\s*-\s*\d+\s*$', line) and i+1 < len(lines):
-                next_line = lines[i+1]
-                next_is_number = False
-                for cfg in self.level_configs:
-                    if cfg.get('pattern').match(next_line):
-                        next_is_number = True
-                        break
-                
-                if not next_is_number:
-                    print(f"检测到跨行二级标题: '{line}' + '{next_line}'")
-                    line = f"{line} {next_line}"
-                    i += 1
+            def is_entry(line):
+                return classify(line) is not None or _TRAILING_DOTS_PATTERN.search(line) is not None
             
-            # 以及一级目录格式 n-
-            elif re.match(r'^\s*\d+\s*-\s*$', line) and i+1 < len(lines):
-                next_line = lines[i+1]
-                next_is_number = False
-                for cfg in self.level_configs:
-                    if cfg.get('pattern').match(next_line):
-                        next_is_number = True
-                        break
-                
-                if not next_is_number:
-                    print(f"检测到跨行一级标题: '{line}' + '{next_line}'")
-                    line = f"{line} {next_line}"
-                    i += 1
+            lines, removed = remove_running_lines(lines, normalize=normalize, is_entry=is_entry)
+            self.stats.count('parse', 'running_lines', removed)
+        if self.remove_duplicate_pages:
+            lines, removed = remove_duplicate_pages(lines)
+            self.stats.count('parse', 'duplicate_pages', removed)
+        return lines
+
+    def _parse_chunks_parallel(self, lines, chunks):
+        """分块并行解析：各进程负责拼接与匹配，主进程按顺序拼接结果
+
+        分块边界都在分页标记处，而跨行拼接不会跨页，所以每块的匹配结果与
+        串行解析完全一致；层级状态（当前行、上一次匹配的层级）在拼接阶段由
+        OutlineBuilder 依次折叠，跨块延续。
+        """
+        self.stats.count('parse', 'lines', len(lines))
+        self.stats.count('parse', 'chunks', len(chunks))
+        logger.info("并行解析 %d 行文本，分为 %d 块", len(lines), len(chunks))
+        
+        # 子进程只接收不可变的配置对象，正则在各进程内编译一次
+        profile = self.to_profile()
+        with ProcessPoolExecutor(max_workers=self.parallel_workers) as executor:
+            results = list(executor.map(_match_chunk, [profile] * len(chunks), chunks))
+        
+        matches = []
+        for chunk_matches, chunk_stats in results:
+            matches.extend(chunk_matches)
+            self.stats.merge(chunk_stats)
+        return self._finish_outline(matches, len(self.level_configs))
+
+    def _finish_outline(self, matches, max_depth, resolve_pages=True):
+        match_count = len(matches)
+        if self.sequence_filter:
+            matches = self.filter_sequence(matches)
+        if resolve_pages:
+            matches = self.resolve_pdf_pages(matches)
+        outline = self.build_outline(matches, max_depth)
+
+        self.stats.count('parse', 'matches', match_count)
+        logger.info("总共找到 %d 个匹配的标题行，生成 %d 行大纲数据", match_count, len(outline))
+        
+        # 移除明显是页码的单独条目，但条件放宽
+        # 只有当所有非空元素都只包含数字时才过滤
+        filtered_outline = outline.select(
+            index for index, entry in enumerate(outline) if not _is_number_row(entry))
+
+        if self.deduplicate_rows:
+            normalize = self.normalizer.normalize if self.normalize_text else None
+            row_count = len(filtered_outline)
+            filtered_outline = deduplicate_rows(filtered_outline, normalize)
+            self.stats.count('parse', 'duplicate_rows', row_count - len(filtered_outline))
+
+        self.stats.count('parse', 'rows', len(filtered_outline))
+        if logger.isEnabledFor(logging.DEBUG):
+            for row in filtered_outline:
+                logger.debug("大纲行: %s", row)
+
+        return filtered_outline
+
+    def match_lines(self, lines):
+        """拼接跨行标题并逐行匹配，返回 [(层级下标, 清理后的标题, 印刷页码, 所在PDF页码)]"""
+        normalize = self.normalizer.normalize if self.normalize_text else None
+        assembler = LineAssembler(self.level_configs, self.max_lookahead, self.stats, normalize)
+        # 屏蔽关键词所在的行在拼接前就丢弃
+        if self.blocked_keywords:
+            source = (line for line in lines if not any(keyword in line for keyword in self.blocked_keywords))
+        else:
+            source = lines
+        
+        matches = []
+        pdf_page = 0
+        for line, config in assembler.assemble(source):
+            if config is None:
+                # 记录当前所在的PDF页
+                m = PAGE_MARKER_PATTERN.match(line)
+                if m:
+                    pdf_page = int(m.group(1))
+                continue
             
-            # 尝试匹配当前行
-            for config in self.level_configs:
-                match = config.get('pattern').match(line)
-                if match:
-                    match_count += 1
-                    depth_idx = config.get('depth') - 1
-                    matched = True
-                    matched_config = config
-                    
-                    # 打印匹配信息
-                    print(f"匹配成功: 层级 {depth_idx+1}, 行: '{line}'")
-                    
-                    # 清理标题，移除页码
-                    line = self.clean_title(line)
-                    
-                    # 检查是否需要在分隔符处截断
-                    separators = '；;。'  # 基础分隔符
-                    if self.colon_truncate:
-                        separators += '：:'  # 如果启用冒号截断，添加冒号
-                    for sep in separators:
-                        sep_idx = line.find(sep)
-                        if sep_idx > 0:
-                            line = line[:sep_idx].strip()
-                            break
-                    break
+            depth_idx = config.get('depth') - 1
+            logger.debug("匹配成功: 层级 %d, 行: '%s'", depth_idx + 1, line)
             
-            if matched:
-                # 检查是否只有编号没有标题内容
-                # 通过检查匹配内容是否基本等于整行来判断
-                match_content = line.strip()
-                is_number_only = True
-                for c in match_content:
-                    if c.isalpha() and c not in 'IVX':  # 排除罗马数字
-                        is_number_only = False
-                        break
-                
-                # 如果只有编号，且还有下一行，尝试合并
-                if is_number_only and i + 1 < len(lines):
-                    next_line = lines[i + 1]
-                    # 确保下一行不是另一个编号
-                    next_line_is_number = False
-                    for config in self.level_configs:
-                        if config.get('pattern').match(next_line):
-                            next_line_is_number = True
-                            break
-                    
-                    if not next_line_is_number:
-                        # 合并当前行和下一行
-                        line = f"{line} {next_line}"
-                        line = self.clean_title(line)  # 再次清理合并后的标题
-                        i += 1  # 跳过下一行
-                
-                # 如果是更高层级或同级的新标题，保存当前行并创建新行
-                if depth_idx <= last_matched_level:
-                    if any(current_entry):
-                        outline.append(current_entry[:])
-                    current_entry = [""] * max_depth
-                    # 保留更高层级的标题
-                    for j in range(depth_idx):
-                        current_entry[j] = outline[-1][j] if outline else ""
-                
-                current_entry[depth_idx] = line
-                last_matched_level = depth_idx
+            line, page = self.finish_title(line)
+            matches.append((depth_idx, line, page, pdf_page))
+        return matches
+
+    def finish_title(self, line):
+        """清理匹配到的标题：移除页码（同时取出页码），在分隔符处截断"""
+        line, page = self.clean_title_page(line)
+        
+        # 检查是否需要在分隔符处截断
+        separators = '；;。'  # 基础分隔符
+        if self.colon_truncate:
+            separators += '：:'  # 如果启用冒号截断，添加冒号
+        for sep in separators:
+            sep_idx = line.find(sep)
+            if sep_idx > 0:
+                line = line[:sep_idx].strip()
+                break
+        return line, page
+
+    def parse_document(self, text, link_entries=None):
+        """启用目录链接且文档有可点击目录时按链接解析，否则解析文本"""
+        if self.use_links and link_entries:
+            return self.parse_links(link_entries)
+        return self.parse_text(text)
+
+    def parse_links(self, entries):
+        """按目录链接解析：entries 为 [(链接文字, 目标PDF页码)]
+
+        链接文字即完整的目录条目，不需要跨行拼接；PDF页码直接取链接目标，不做估计。
+        """
+        with self.stats.stage('parse'):
+            self.stats.count('parse', 'links', len(entries))
+            normalize = self.normalizer.normalize if self.normalize_text else None
+            assembler = LineAssembler(self.level_configs, normalize=normalize)
+            matches = []
+            for text, target in entries:
+                if self.blocked_keywords and any(keyword in text for keyword in self.blocked_keywords):
+                    continue
+                config = assembler.classify(text)
+                if config is None:
+                    continue
+                title, page = self.finish_title(text)
+                matches.append((config['depth'] - 1, title, page, target))
+            return self._finish_outline(matches, len(self.level_configs), resolve_pages=False)
+
+    def resolve_pdf_pages(self, matches):
+        """有印刷页码且估计出了页码偏移时，PDF页码取标题指向的页；
+        否则取标题本身所在的页（正文中的标题）。偏移未知时目录条目的PDF页码为0"""
+        offset = self.page_offset
+        resolved = []
+        for depth_idx, title, page, pdf_page in matches:
+            if page:
+                pdf_page = page + offset if offset is not None else 0
+            resolved.append((depth_idx, title, page, pdf_page))
+        return resolved
+
+    def build_outline(self, matches, max_depth):
+        """按层级关系把匹配结果组装为大纲行"""
+        builder = OutlineBuilder(max_depth)
+        builder.feed(matches)
+        return builder.finish()
+
+    def filter_sequence(self, matches):
+        """序号连续性过滤：每个层级只保留最长的连续编号链
+
+        先处理上层，下层的编号按上层标题分段，每段内部单独求最长链，
+        这样子标题在每个父标题下重新从1开始也能正确处理。上层标题被过滤掉时，
+        它下面的整段子标题一起丢弃，不会挂到前一个保留的上层标题下。每层一次线性扫描。
+        """
+        kinds = {cfg['depth'] - 1: (cfg.get('kind'), cfg.get('ordinal_position', 0)) for cfg in self.level_configs}
+        normalize = self.normalizer.normalize if self.normalize_text else (lambda text: text)
+        ordinals = [extract_ordinal(normalize(title), *kinds.get(depth_idx, (None, 0))) for depth_idx, title, *_ in matches]
+        keep = [True] * len(matches)
+        
+        def select(segment):
+            chain = longest_ordinal_chain([ordinals[idx] for idx in segment], self.sequence_max_gap)
+            for position, idx in enumerate(segment):
+                if position not in chain:
+                    keep[idx] = False
+        
+        for depth in sorted(kinds):
+            segment = []
+            orphaned = False  # 当前段的上级标题已被过滤掉
+            for idx, (depth_idx, *_) in enumerate(matches):
+                if depth_idx < depth:
+                    select(segment)
+                    segment = []
+                    orphaned = not keep[idx]
+                elif depth_idx == depth:
+                    if orphaned:
+                        keep[idx] = False
+                    elif ordinals[idx] is not None:
+                        segment.append(idx)
+            select(segment)
+        
+        filtered = [match for match, kept in zip(matches, keep) if kept]
+        self.stats.count('parse', 'sequence_dropped', len(matches) - len(filtered))
+        return filtered
+
+    def _deduplicate(self, outline):
+        last_values = {}
+        cleaned = []
+        for entry in outline:
+            new_entry = []
+            for idx, value in enumerate(entry):
+                if value == last_values.get(idx):
+                    new_entry.append("")
+                else:
+                    new_entry.append(value)
+                    last_values[idx] = value
+            cleaned.append(new_entry)
+        return cleaned
+
+class OutlinePreview:
+    """提取过程中逐页生成的预览大纲
+
+    每页文本到达后单独拼接、匹配（跨行拼接本来就不跨页），结果接着喂给同一个
+    OutlineBuilder，take_rows 取出上次之后新完成的行。去除页眉页脚、重复页、
+    页码偏移估计和序号过滤需要全文，预览中不做，提取结束后由完整解析的结果替换。
+    """
+    def __init__(self, extractor):
+        self.extractor = extractor
+        self.builder = OutlineBuilder(len(extractor.level_configs))
+        self.taken = 0
+
+    def feed(self, page_text):
+        lines = [line.strip() for line in page_text.split("\n") if line.strip()]
+        # 页码偏移未知，目录条目的PDF页码暂时留空
+        matches = self.extractor.resolve_pdf_pages(self.extractor.match_lines(lines))
+        self.builder.feed(matches)
+
+    def take_rows(self):
+        outline = self.builder.outline
+        batch = outline.select(index for index in range(self.taken, len(outline))
+                               if not _is_number_row(outline[index]))
+        self.taken = len(outline)
+        return batch
+
+LINK_TOC_MIN_LINKS = 3  # 页内跳转链接达到该数量的页面才视为可点击的目录页
+
+def collect_link_entries(page, min_links=LINK_TOC_MIN_LINKS):
+    """读取目录页上的页内跳转链接，返回 [(链接区域内的文字, 目标PDF页码)]
+
+    每个链接区域与该页文字块中的文字片段按位置关联（片段中心落在链接区域内），
+    标题到页码的对应关系直接来自PDF结构，不需要从文本中猜测页码。
+    单独链接的页码（只有数字的链接）跳过，它们与标题指向同一页。
+    """
+    links = [link for link in page.get_links() if link.get('kind') == fitz.LINK_GOTO and link.get('page', -1) >= 0]
+    if len(links) < min_links:
+        return []
+    spans = []
+    for block in page.get_text("dict")["blocks"]:
+        for line in block.get("lines", ()):
+            for span in line["spans"]:
+                if span["text"].strip():
+                    x0, y0, x1, y1 = span["bbox"]
+                    spans.append(((x0 + x1) / 2, (y0 + y1) / 2, round(y0), x0, x1, span["size"], span["text"]))
+    
+    entries = []
+    for link in links:
+        rect = link['from']
+        inside = sorted((top, x0, x1, size, text) for cx, cy, top, x0, x1, size, text in spans
+                        if rect.x0 <= cx <= rect.x1 and rect.y0 <= cy <= rect.y1)
+        text = ""
+        last_top = last_x1 = None
+        for top, x0, x1, size, span_text in inside:
+            if last_top is None:
+                text = span_text
+            elif top == last_top:
+                # 同一行的片段之间有明显间距时补一个空格，与纯文本提取的结果一致
+                if x0 - last_x1 > size * 0.15 and not text.endswith(' ') and not span_text.startswith(' '):
+                    text += ' '
+                text += span_text
+            else:
+                # 折行的标题
+                text = _join_wrapped(text.strip(), span_text.strip())
+            last_top, last_x1 = top, x1
+        text = text.strip()
+        if text and not PAGE_ONLY_PATTERN.match(text):
+            entries.append((text, link['page'] + 1))
+    return entries
+
+# 目录引导线使用的字符：各种点号、省略号、中点和下划线
+LEADER_CHARS = frozenset('.．·•‧∙・…⋯‥_ \u3000')
+GEOMETRY_ALIGN_TOLERANCE = 1.0  # 页码右端与页内对齐线的允许偏差（字号的倍数）
+GEOMETRY_MIN_GAP = 1.5  # 没有引导线时页码与标题的最小间距（字号的倍数）
+
+def _trailing_number(chars):
+    """行末的数字和它前面的引导线，返回 (标题结束下标, 数字起始下标, 数字结束下标)，不是页码形态时返回 None"""
+    end = len(chars)
+    while end and chars[end - 1][0].isspace():
+        end -= 1
+    start = end
+    while start and '0' <= chars[start - 1][0] <= '9':
+        start -= 1
+    if start == end or end - start > 4:
+        return None
+    title_end = start
+    while title_end and chars[title_end - 1][0] in LEADER_CHARS:
+        title_end -= 1
+    return title_end, start, end
+
+def geometry_page_text(page, tolerance=GEOMETRY_ALIGN_TOLERANCE, min_gap=GEOMETRY_MIN_GAP):
+    """按文字位置提取一页文本：行最右端、与页内其他页码右对齐的数字视为页码
+
+    页码与标题之间的引导线（点号、省略号、中点等任意字符）整段去掉，页码用制表符接在标题后。
+    与标题紧挨着、又没有引导线隔开的数字（如 "Windows 10"）保留在标题中。
+    页码单独排成一列（与标题不在同一文字行）时，按所在的行并回标题后面。
+    """
+    lines = []
+    for block in page.get_text("rawdict")["blocks"]:
+        for line in block.get("lines", ()):
+            chars = [(char["c"], char["bbox"][0], char["bbox"][2]) for span in line["spans"] for char in span["chars"]]
+            if chars:
+                size = max(span["size"] for span in line["spans"]) or 1.0
+                y0, y1 = line["bbox"][1], line["bbox"][3]
+                lines.append([chars, size, (y0 + y1) / 2])
+    
+    # 单独成行的页码（只有引导线和数字）并到同一高度、位于其左侧的行末尾
+    kept = []
+    for line in lines:
+        chars, size, center = line
+        tail = _trailing_number(chars)
+        if tail and tail[0] == 0 and kept:
+            row = next((other for other in reversed(kept)
+                        if abs(other[2] - center) < size * 0.5 and other[0][-1][2] <= chars[0][1]), None)
+            if row is not None:
+                row[0] = row[0] + chars
+                continue
+        kept.append(line)
+    
+    # 一次扫描找出每行末尾的页码候选，再以最右端的候选为对齐线筛选
+    candidates = []
+    for idx, (chars, size, _) in enumerate(kept):
+        tail = _trailing_number(chars)
+        if not tail or tail[0] == 0:
+            continue
+        title_end, start, end = tail
+        has_leader = any(not c.isspace() for c, _, _ in chars[title_end:start])
+        if has_leader or chars[start][1] - chars[title_end - 1][2] >= min_gap * size:
+            candidates.append((idx, title_end, start, end, chars[end - 1][2], size))
+    right = max((x1 for *_, x1, _ in candidates), default=0)
+    numbers = {idx: (title_end, start, end) for idx, title_end, start, end, x1, size in candidates
+               if x1 >= right - tolerance * size}
+    
+    text_lines = []
+    for idx, (chars, _, _) in enumerate(kept):
+        if idx in numbers:
+            title_end, start, end = numbers[idx]
+            title = "".join(c for c, _, _ in chars[:title_end]).rstrip()
+            number = "".join(c for c, _, _ in chars[start:end])
+            text_lines.append(f"{title}{GEOMETRY_PAGE_SEPARATOR}{number}")
+        else:
+            text_lines.append("".join(c for c, _, _ in chars))
+    return "\n".join(text_lines) + "\n"
+
+PROGRESS_MIN_INTERVAL = 1 / 30  # 两次进度回调的最小间隔（秒），每秒最多约30次
+
+def format_eta(seconds):
+    """剩余时间的显示文本，无法估计时返回空字符串"""
+    if seconds is None or seconds < 1:
+        return ""
+    minutes, seconds = divmod(int(round(seconds)), 60)
+    return f"剩余约{minutes}分{seconds}秒" if minutes else f"剩余约{seconds}秒"
+
+class ProgressReporter:
+    """限速的进度报告，不依赖 Qt，后台线程和无界面的批处理用法相同
+
+    两次回调至少间隔 min_interval 秒，中间的更新直接丢弃；每一轮的开始、结束和阶段
+    说明变化时总会回调。剩余时间按本轮已完成项目的平均耗时（每页吞吐量）估计。
+    回调收到 (已完成数, 总数, 阶段说明, 预计剩余秒数)，还无法估计时剩余秒数为 None。
+    """
+    def __init__(self, callback=None, min_interval=PROGRESS_MIN_INTERVAL, clock=time.perf_counter):
+        self.callback = callback
+        self.min_interval = min_interval
+        self.clock = clock
+        self.total = None
+        self.done = 0
+        self.label = ""
+        self.started = self.last_emit = None
+
+    def eta(self, now=None):
+        if not self.done or not self.total or self.started is None:
+            return None
+        elapsed = (now if now is not None else self.clock()) - self.started
+        return elapsed / self.done * max(self.total - self.done, 0)
+
+    def update(self, done, total, label=None):
+        now = self.clock()
+        if total != self.total or done < self.done:
+            # 新的一轮，重新计时
+            self.total = total
+            self.started = now
+            self.last_emit = None
+        self.done = done
+        label_changed = label is not None and label != self.label
+        if label is not None:
+            self.label = label
+        if (self.last_emit is not None and not label_changed and done < total
+                and now - self.last_emit < self.min_interval):
+            return
+        self.last_emit = now
+        if self.callback:
+            self.callback(done, total, self.label, self.eta(now))
+
+class ExtractionCancelled(Exception):
+    """提取过程被用户取消"""
+
+class PdfTextExtractor:
+    """从PDF中提取带分页标记的文本，必要时OCR；只依赖配置对象，不依赖界面
+
+    progress 回调接收 (已完成页数, 总页数, 当前阶段说明, 预计剩余秒数)，经 ProgressReporter
+    限速后调用，界面用它更新进度条，批处理可以不传。page_done 在每页提取完成后
+    以该页带分页标记的文本调用，用于边提取边预览。cancelled 回调返回 True 时在下一页开始前抛出 ExtractionCancelled。
+    """
+    def __init__(self, profile, stats=None, progress=None, cancelled=None, page_done=None):
+        self.profile = profile
+        self.stats = stats if stats is not None else Instrumentation()
+        self.reporter = ProgressReporter(progress)
+        self.cancelled = cancelled
+        self.page_done = page_done
+        self.link_entries = []  # 可点击目录的 [(链接文字, 目标PDF页码)]
+        if HAS_TESSERACT and profile.tesseract_cmd:
+            pytesseract.pytesseract.tesseract_cmd = profile.tesseract_cmd
+    
+    def report(self, done, total, label):
+        self.reporter.update(done, total, label)
+    
+    def check_cancelled(self):
+        if self.cancelled and self.cancelled():
+            raise ExtractionCancelled()
+    
+    def page_text(self, page):
+        if self.profile.geometry_pages:
+            return geometry_page_text(page)
+        return page.get_text("text")
+    
+    def extract(self, pdf_path):
+        """使用PyMuPDF提取PDF文本，支持多栏结构"""
+        try:
+            doc = fitz.open(pdf_path)
+            text = ""
+            total_pages = len(doc)
+            
+            # 检查是否开启强制OCR模式
+            force_ocr = self.profile.force_ocr
+            
+            # 更新进度条标题
+            if force_ocr and HAS_TESSERACT:
+                label = "OCR识别PDF中"
+            else:
+                label = "提取文本中"
+            self.report(0, total_pages, label)
+            
+            stats = self.stats
+            for i, page in enumerate(doc):
+                self.check_cancelled()
+                # 获取页面尺寸信息
+                width, height = page.rect.width, page.rect.height
+                stats.count('extract', 'pages')
+                
+                # 根据模式选择提取方法
+                if not force_ocr:
+                    # 正常模式：直接提取文本，或按文字位置识别页码
+                    page_text = self.page_text(page)
+                    
+                    # 检测是否需要OCR (如果页面没有文本或文本极少)
+                    if len(page_text.strip()) < 20 and HAS_TESSERACT:
+                        ocr_start = time.perf_counter()
+                        stats.count('ocr', 'pages')
+                        try:
+                            # 尝试OCR处理
+                            # 对大页面降低DPI
+                            if width * height > 1000000:  # 超过100万平方点
+                                matrix = fitz.Matrix(150/72, 150/72)  # 使用较低DPI
+                            else:
+                                matrix = fitz.Matrix(300/72, 300/72)  # 默认300 DPI
+                                
+                            pix = page.get_pixmap(matrix=matrix)
+                            img = Image.open(io.BytesIO(pix.tobytes()))
+                            
+                            # 处理超大图像
+                            img_width, img_height = img.size
+                            if img_width * img_height > 20000000:  # 2千万像素
+                                scale = min(1.0, 4000 / max(img_width, img_height))
+                                new_width = int(img_width * scale)
+                                new_height = int(img_height * scale)
+                                img = img.resize((new_width, new_height), Image.LANCZOS)
+                            
+                            # 使用中文+英文识别，提高准确率
+                            ocr_text = pytesseract.image_to_string(
+                                img, 
+                                lang=self.profile.ocr_lang,
+                                config='--psm 1 --oem 3'  # 自动页面分割，使用LSTM引擎
+                            )
+                            
+                            if ocr_text and len(ocr_text.strip()) > len(page_text.strip()):
+                                page_text = ocr_text
+                                logger.info("第%d页使用OCR结果，识别到%d个字符", i + 1, len(ocr_text.strip()))
+                        except Exception as e:
+                            logger.warning("第%d页OCR处理失败: %s", i + 1, e)
+                        stats.add_time('ocr', time.perf_counter() - ocr_start)
+                else:
+                    # 强制OCR模式：对每一页使用OCR
+                    if HAS_TESSERACT:
+                        ocr_start = time.perf_counter()
+                        stats.count('ocr', 'pages')
+                        try:
+                            # 更新进度条
+                            label = f"OCR识别第{i+1}/{total_pages}页"
+                            self.report(i, total_pages, label)
+                            
+                            # 对特别大的页面使用较低DPI
+                            if width * height > 1000000:  # 超过100万平方点
+                                matrix = fitz.Matrix(150/72, 150/72)  # 使用低DPI
+                                logger.debug("页面%d较大(%.0fx%.0f)，使用低DPI(150)", i + 1, width, height)
+                            else:
+                                matrix = fitz.Matrix(300/72, 300/72)  # 默认300 DPI
+                            
+                            # 获取图像
+                            pix = page.get_pixmap(matrix=matrix)
+                            img = Image.open(io.BytesIO(pix.tobytes()))
+                            
+                            # 处理超大图像
+                            img_width, img_height = img.size
+                            if img_width * img_height > 20000000:  # 2千万像素
+                                scale = min(1.0, 3000 / max(img_width, img_height))
+                                new_width = int(img_width * scale)
+                                new_height = int(img_height * scale)
+                                logger.debug("图像过大(%dx%d)，缩小至%dx%d", img_width, img_height, new_width, new_height)
+                                img = img.resize((new_width, new_height), Image.LANCZOS)
+                            
+                            # 可选：图像预处理
+                            try:
+                                # 对图像进行增强，提高OCR识别率
+                                if img.mode != 'RGB':
+                                    img = img.convert('L')  # 转为灰度
+                                    
+                                    # 使用PIL进行图像增强
+                                    from PIL import ImageFilter, ImageEnhance
+                                    
+                                    # 锐化
+                                    img = img.filter(ImageFilter.SHARPEN)
+                                    
+                                    # 增强对比度
+                                    enhancer = ImageEnhance.Contrast(img)
+                                    img = enhancer.enhance(2.0)
+                                    
+                                    # 保存处理后的图像用于调试
+                                    debug_dir = os.path.join(os.path.dirname(pdf_path), "debug_ocr")
+                                    os.makedirs(debug_dir, exist_ok=True)
+                                    debug_file = os.path.join(debug_dir, f"page_{i+1}.png")
+                                    img.save(debug_file)
+                                    logger.debug("已保存处理后图像: %s", debug_file)
+                            except Exception as e:
+                                logger.warning("图像增强失败: %s", e)
+                            
+                            # 尝试多种OCR配置
+                            best_text = ""
+                            best_len = 0
+                            ocr_configs = [
+                                '--psm 1 --oem 3',  # 自动分页
+                                '--psm 6 --oem 3',  # 单文本块
+                            ]
+                            
+                            for config in ocr_configs:
+                                try:
+                                    temp_text = pytesseract.image_to_string(
+                                        img, 
+                                        lang=self.profile.ocr_lang,
+                                        config=config
+                                    )
+                                    if len(temp_text.strip()) > best_len:
+                                        best_text = temp_text
+                                        best_len = len(temp_text.strip())
+                                except Exception as e:
+                                    logger.warning("OCR配置 %s 失败: %s", config, e)
+                                    
+                            # 使用最佳结果
+                            page_text = best_text if best_len > 0 else "OCR识别失败"
+                            logger.info("第%d页OCR识别完成，识别到%d个字符", i + 1, best_len)
+                        except Exception as e:
+                            page_text = f"第{i+1}页OCR处理失败: {e}"
+                            logger.warning(page_text)
+                        stats.add_time('ocr', time.perf_counter() - ocr_start)
+                    else:
+                        # 没有安装pytesseract，使用普通提取
+                        page_text = self.page_text(page)
+                        if not page_text.strip():
+                            page_text = f"[第{i+1}页没有识别到文本，请安装pytesseract启用OCR]"
+                
+                # 可点击目录：页内跳转链接足够多的页面视为目录页
+                self.link_entries.extend(collect_link_entries(page))
+                
+                # 添加页码信息
+                page_chunk = f"=== 第{i+1}页 ===\n{page_text}\n"
+                text += page_chunk
+                if self.page_done:
+                    self.page_done(page_chunk)
+                
+                # 更新进度条
+                self.report(i + 1, total_pages, label)
+            
+            # 如果提取的文本太少且不是强制OCR模式，尝试备用方法
+            if len(text.strip()) < 100 and not force_ocr:
+                # 备用方法：使用pdfplumber
+                return self.extract_with_pdfplumber(pdf_path)
+            
+            return text
+        except ExtractionCancelled:
+            raise
+        except Exception as e:
+            logger.warning("PyMuPDF提取失败: %s", e)
+            # 回退到pdfplumber
+            return self.extract_with_pdfplumber(pdf_path)
+    
+    def extract_with_pdfplumber(self, pdf_path):
+        """使用pdfplumber提取PDF文本(备用方法)"""
+        with pdfplumber.open(pdf_path) as pdf:
+            total_pages = len(pdf.pages)
+            text = ""
+            for i, page in enumerate(pdf.pages):
+                self.check_cancelled()
+                try:
+                    # 尝试按表格提取，这可能有助于保持多栏结构
+                    tables = page.extract_tables()
+                    if tables:
+                        # 处理表格
+                        for table in tables:
+                            for row in table:
+                                text += " | ".join([cell if cell else "" for cell in row]) + "\n"
+                    
+                    # 再提取普通文本
+                    page_text = page.extract_text()
+                    if page_text:
+                        text += page_text + "\n"
+                except Exception as e:
+                    logger.warning("提取页面 %d 时出错: %s", i + 1, e)
+                    # 尝试基本提取
+                    try:
+                        page_text = page.extract_text()
+                        if page_text:
+                            text += page_text + "\n"
+                    except:
+                        pass
+                
+                # 更新进度条
+                self.report(i + 1, total_pages, "提取文本中")
+            
+            text = f"=== 第{i+1}页 ===\n{text}\n"
+            return text
+
+class KeywordDialog(QDialog):
+    def __init__(self, parent=None, keywords=None):
+        super().__init__(parent)
+        self.keywords = keywords or set()
+        self.init_ui()
+        
+    def init_ui(self):
+        self.setWindowTitle("关键词屏蔽配置")
+        layout = QVBoxLayout()
+        
+        # 说明标签
+        tip_label = QLabel("请输入需要屏蔽的关键词，每行一个：")
+        layout.addWidget(tip_label)
+        
+        # 关键词输入框
+        self.keyword_input = QTextEdit()
+        self.keyword_input.setPlaceholderText("在此输入关键词，每行一个")
+        # 设置现有的关键词
+        self.keyword_input.setText("\n".join(sorted(self.keywords)))
+        layout.addWidget(self.keyword_input)
+        
+        # 按钮布局
+        btn_layout = QHBoxLayout()
+        
+        # 确定按钮
+        self.ok_button = QPushButton("确定")
+        self.ok_button.clicked.connect(self.accept)
+        btn_layout.addWidget(self.ok_button)
+        
+        # 取消按钮
+        self.cancel_button = QPushButton("取消")
+        self.cancel_button.clicked.connect(self.reject)
+        btn_layout.addWidget(self.cancel_button)
+        
+        layout.addLayout(btn_layout)
+        self.setLayout(layout)
+        
+        # 设置对话框大小
+        self.resize(400, 300)
+    
+    def get_keywords(self):
+        """获取输入的关键词列表"""
+        text = self.keyword_input.toPlainText()
+        return {line.strip() for line in text.split('\n') if line.strip()}
+
+def merge_spans(rows, level_count):
+    """计算目录层级列的合并区域 [(起始行, 列, 行数)]
+
+    同一列相邻的相同非空值，且前面各列也都相同时合并。每列线性扫描一次，
+    相邻两行在前面各列上是否相同由上一列的结果递推，不必逐行回看前面的列。
+    """
+    n = len(rows)
+    same_prefix = [True] * n  # 第 r 行与第 r-1 行在已扫描的列上是否都相同
+    spans = []
+    for col in range(level_count):
+        values = [(row[col] if col < len(row) else "").strip() for row in rows]
+        start = 0
+        for r in range(1, n + 1):
+            if r < n and same_prefix[r] and values[r] == values[r - 1]:
+                continue
+            if r - start > 1 and values[start]:
+                spans.append((start, col, r - start))
+            start = r
+        for r in range(1, n):
+            same_prefix[r] = same_prefix[r] and values[r] == values[r - 1]
+    return spans
+
+EXCEL_STYLE_TOP = "目录-顶端对齐"  # 导出 Excel 时共用的命名样式
+EXCEL_STYLE_CENTER = "目录-垂直居中"
+EXCEL_COLUMN_PADDING = 4  # 列宽在最长内容之外留出的字符数
+
+def excel_text_width(value):
+    """估算值在 Excel 中占用的列宽（字符数），中文按两个字符计"""
+    return sum(2 if ord(char) > 127 else 1 for char in str(value))
+
+EXCEL_SHEET_TITLE_LENGTH = 31  # Excel 工作表名的最大长度
+EXCEL_INVALID_TITLE_CHARS = re.compile(r'[\[\]:*?/\\]')
+
+def excel_sheet_title(name, used):
+    """由文件名生成合法且不与 used 中重复的工作表名，生成的名字加入 used
+
+    Excel 比较工作表名时不区分大小写，used 中保存小写形式。
+    """
+    base = EXCEL_INVALID_TITLE_CHARS.sub('_', name).strip("' ")[:EXCEL_SHEET_TITLE_LENGTH] or "Sheet"
+    title, n = base, 2
+    while title.lower() in used:
+        suffix = f"({n})"
+        title = base[:EXCEL_SHEET_TITLE_LENGTH - len(suffix)] + suffix
+        n += 1
+    used.add(title.lower())
+    return title
+
+def outline_headers(level_count, has_pages):
+    """结果表格和导出 Excel 的表头"""
+    headers = [f"{convert_to_chinese_num(i+1)}级目录" for i in range(level_count)]
+    if has_pages:
+        headers += PAGE_COLUMN_HEADERS
+    return headers
+
+class OutlineWorkbookWriter:
+    """以 openpyxl 只写模式流式写出大纲，每个工作表写完即落到临时文件
+
+    单元格不在内存中建立，写完的工作表也不再保留数据，导出的行数和工作表数
+    再多内存也不会随之增长。对齐方式用整本工作簿共用的命名样式，不为每个单元格
+    新建 Alignment。
+    """
+    def __init__(self):
+        self.workbook = openpyxl.Workbook(write_only=True)
+        for name, vertical in ((EXCEL_STYLE_TOP, 'top'), (EXCEL_STYLE_CENTER, 'center')):
+            self.workbook.add_named_style(openpyxl.styles.NamedStyle(
+                name=name, alignment=openpyxl.styles.Alignment(vertical=vertical, horizontal='left')))
+        self.sheet_count = 0
+
+    def write_sheet(self, headers, rows, level_count, page_columns=(), spans=None,
+                    vertical_center=False, title=None):
+        """写出一个工作表
+
+        rows 为目录层级列的字符串行，page_columns 为各页码列的整型数组，spans 为
+        merge_spans 的结果，传入时按合并区域合并单元格，被合并的单元格不再写值。
+        """
+        ws = self.workbook.create_sheet(title)
+        covered = None
+        if spans:
+            covered = [bytearray(len(rows)) for _ in range(level_count)]
+            for row, col, count in spans:
+                covered[col][row + 1:row + count] = b'\x01' * (count - 1)
+        
+        def level_value(row, col):
+            entry = rows[row]
+            if col >= len(entry) or not entry[col] or (covered and covered[col][row]):
+                return None
+            return entry[col]
+        
+        # 列宽须在写第一行之前设定（<cols> 位于 <sheetData> 之前），先扫一遍数据求出各列最长内容
+        widths = [excel_text_width(header) for header in headers]
+        for col in range(level_count):
+            for row in range(len(rows)):
+                value = level_value(row, col)
+                if value:
+                    widths[col] = max(widths[col], excel_text_width(value))
+        for col, pages in enumerate(page_columns, level_count):
+            widths[col] = max([widths[col]] + [len(str(page)) for page in pages if page])
+        for col, width in enumerate(widths, 1):
+            ws.column_dimensions[openpyxl.utils.get_column_letter(col)].width = width + EXCEL_COLUMN_PADDING
+        
+        style = EXCEL_STYLE_CENTER if vertical_center else EXCEL_STYLE_TOP
+        
+        def styled(value):
+            if value is None:
+                return None
+            cell = openpyxl.cell.WriteOnlyCell(ws, value)
+            cell.style = style
+            return cell
+        
+        ws.append(headers)
+        for row in range(len(rows)):
+            values = [styled(level_value(row, col)) for col in range(level_count)]
+            values += [styled(pages[row] or None) for pages in page_columns]
+            ws.append(values)
+        
+        if spans:
+            # 合并区域互不重叠，一次性建立，避免逐个 add 时的重叠检查（与已有区域两两比较）
+            # Excel的行列号从1开始，且要考虑表头行
+            ws.merged_cells = openpyxl.worksheet.cell_range.MultiCellRange(
+                openpyxl.worksheet.cell_range.CellRange(
+                    min_col=col + 1, min_row=row + 2, max_col=col + 1, max_row=row + count + 1)
+                for row, col, count in spans)
+        self.sheet_count += 1
+        return ws
+
+    def save(self, path):
+        self.workbook.save(path)
+
+class OutlineTableModel(QAbstractTableModel):
+    """结果表格的数据模型，直接以大纲行和页码数组为数据源
+
+    视图只为可见的单元格取数据，不再为每个单元格创建表格项；编辑和删除行
+    直接修改这里的数据，保存到 Excel 时也从这里读取。页码列排在目录层级列之后。
+    合并显示（原始数据）和不合并显示（去重后的数据）两份行数据同时保存、逐行对齐，
+    切换显示方式只换数据源，不重建模型。
+    """
+    edited = pyqtSignal()  # 单元格被编辑
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.merged_rows = []
+        self.deduped_rows = []
+        self.rows = self.deduped_rows  # 当前显示的行
+        self.level_count = 0
+        self.headers = []
+        self.pages = None  # 印刷页码数组，大纲不带页码时为 None
+        self.pdf_pages = None
+        self._spans = None  # 合并区域缓存，数据变化时清空
+
+    def set_outline(self, rows, deduped_rows, level_count, headers, pages=None, pdf_pages=None, merged=False):
+        """替换全部数据，行与页码数组各复制一份，编辑和删除不影响原始大纲"""
+        self.beginResetModel()
+        self.merged_rows = [list(row) for row in rows]
+        self.deduped_rows = [list(row) for row in deduped_rows]
+        self.rows = self.merged_rows if merged else self.deduped_rows
+        self.level_count = level_count
+        self.headers = list(headers)
+        self.pages = array('i', pages) if pages is not None else None
+        self.pdf_pages = array('i', pdf_pages) if pdf_pages is not None else None
+        self._spans = None
+        self.endResetModel()
+
+    def set_merged(self, merged):
+        """切换合并/不合并显示的数据源，行数不变，只通知视图刷新"""
+        self.rows = self.merged_rows if merged else self.deduped_rows
+        if self.rows:
+            self.dataChanged.emit(self.index(0, 0), self.index(len(self.rows) - 1, self.level_count - 1),
+                                  [Qt.DisplayRole, Qt.EditRole])
+
+    def has_pages(self):
+        return self.pages is not None
+
+    def merge_spans(self):
+        """合并显示时的合并区域，界面显示和导出 Excel 共用"""
+        if self._spans is None:
+            self._spans = merge_spans(self.merged_rows, self.level_count)
+        return self._spans
+
+    def page_array(self, col):
+        return self.pages if col == self.level_count else self.pdf_pages
+
+    def cell_text(self, row, col):
+        if col < self.level_count:
+            entry = self.rows[row]
+            return entry[col] if col < len(entry) else ""
+        page = self.page_array(col)[row]
+        return str(page) if page else ""
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.headers)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        if role in (Qt.DisplayRole, Qt.EditRole):
+            return self.cell_text(index.row(), index.column())
+        return None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal:
+            return self.headers[section] if section < len(self.headers) else None
+        return str(section + 1)
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.NoItemFlags
+        return Qt.ItemIsSelectable | Qt.ItemIsEnabled | Qt.ItemIsEditable
+
+    def setData(self, index, value, role=Qt.EditRole):
+        if not index.isValid() or role != Qt.EditRole:
+            return False
+        row, col = index.row(), index.column()
+        if col < self.level_count:
+            # 两种显示方式的同一行同时修改
+            for entry in (self.merged_rows[row], self.deduped_rows[row]):
+                if col >= len(entry):
+                    entry.extend([""] * (col + 1 - len(entry)))
+                entry[col] = value
+        else:
+            value = value.strip()
+            if value and not value.isdigit():
+                return False  # 页码列只接受数字
+            self.page_array(col)[row] = int(value) if value else 0
+        self._spans = None
+        self.dataChanged.emit(index, index, [Qt.DisplayRole, Qt.EditRole])
+        self.edited.emit()
+        return True
+
+    def append_rows(self, rows, deduped_rows, pages=None, pdf_pages=None):
+        """在末尾追加行，视图只插入新行，已有的行不受影响"""
+        if not rows:
+            return
+        first = len(self.merged_rows)
+        self.beginInsertRows(QModelIndex(), first, first + len(rows) - 1)
+        self.merged_rows.extend(list(row) for row in rows)
+        self.deduped_rows.extend(list(row) for row in deduped_rows)
+        if self.pages is not None:
+            self.pages.extend(pages if pages is not None else [0] * len(rows))
+            self.pdf_pages.extend(pdf_pages if pdf_pages is not None else [0] * len(rows))
+        self._spans = None
+        self.endInsertRows()
+
+    def removeRows(self, row, count, parent=QModelIndex()):
+        if count <= 0 or row < 0 or row + count > len(self.rows):
+            return False
+        self.beginRemoveRows(parent, row, row + count - 1)
+        del self.merged_rows[row:row + count]
+        del self.deduped_rows[row:row + count]
+        if self.pages is not None:
+            del self.pages[row:row + count]
+            del self.pdf_pages[row:row + count]
+        self._spans = None
+        self.endRemoveRows()
+        return True
+
+RELAYOUT_DELAY_MS = 100  # 窗口尺寸停止变化后多久重新布局表格
+REPARSE_DELAY_MS = 150  # 选项、正则停止变化后多久重新解析
+
+class CoalescingScheduler:
+    """把短时间内的一连串请求合并为一次延迟执行
+
+    每种任务（用 key 区分）一个单次定时器：延迟期间再次请求只会重新计时并替换回调，
+    被取代的请求直接丢弃，连续拖动窗口或快速勾选多个选项只执行最后一次。
+    """
+    def __init__(self, parent):
+        self.parent = parent
+        self.timers = {}
+        self.callbacks = {}
+
+    def schedule(self, key, callback, delay):
+        timer = self.timers.get(key)
+        if timer is None:
+            timer = QTimer(self.parent)
+            timer.setSingleShot(True)
+            timer.timeout.connect(lambda: self._run(key))
+            self.timers[key] = timer
+        self.callbacks[key] = callback
+        timer.start(delay)
+
+    def cancel(self, key):
+        """丢弃尚未执行的请求"""
+        if key in self.timers:
+            self.timers[key].stop()
+        self.callbacks.pop(key, None)
+
+    def flush(self, key):
+        """立即执行尚未执行的请求"""
+        if key in self.timers:
+            self.timers[key].stop()
+        self._run(key)
+
+    def _run(self, key):
+        callback = self.callbacks.pop(key, None)
+        if callback is not None:
+            callback()
+
+TEXT_METRICS_CACHE_SIZE = 8192  # 文本宽度、换行高度各自缓存的字符串数
+ROW_LAYOUT_MARGIN = 50  # 可见区域上下额外计算行高的行数
+MIN_ROW_HEIGHT = 30  # 结果表格的最小行高（像素），未计算的行先按此高度显示
+MAX_AUTO_COLUMN_WIDTH = 400  # 自适应列宽的上限（像素）
+
+class TextMetricsCache:
+    """结果表格的文字尺寸缓存
+
+    单个字符的宽度查一次后保存在字典里；整段文字的宽度和按列宽换行后的高度
+    用 LRU 缓存，同样的标题（去重前大量重复的上级目录）只计算一次。字体变化时换一个新实例。
+    """
+    def __init__(self, font_metrics, maxsize=TEXT_METRICS_CACHE_SIZE):
+        self.font_metrics = font_metrics
+        self.advances = {}
+        self.text_width = lru_cache(maxsize=maxsize)(self._text_width)
+        self.wrapped_height = lru_cache(maxsize=maxsize)(self._wrapped_height)
+
+    def char_width(self, char):
+        width = self.advances.get(char)
+        if width is None:
+            width = self.font_metrics.boundingRect(char).width()
+            if ord(char) > 127:  # 中文字符留一些余量
+                width = int(width * 1.1)
+            self.advances[char] = width
+        return width
+
+    def _text_width(self, text):
+        return sum(self.char_width(char) for char in text)
+
+    def _wrapped_height(self, text, width):
+        """文字在给定宽度内自动换行后的高度"""
+        return self.font_metrics.boundingRect(
+            0, 0, width, 1000, Qt.TextWordWrap | Qt.AlignLeft | Qt.AlignTop, text).height()
+
+class OutlineItemDelegate(QStyledItemDelegate):
+    """结果表格的单元格绘制，对齐方式在这里统一决定
+
+    切换竖直居中只改一个标志并重绘可见区域，不必逐个修改单元格。
+    """
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.vertical_center = False
+
+    def initStyleOption(self, option, index):
+        super().initStyleOption(option, index)
+        if index.column() < index.model().level_count:
+            option.displayAlignment = Qt.AlignLeft | (Qt.AlignVCenter if self.vertical_center else Qt.AlignTop)
+        else:
+            option.displayAlignment = Qt.AlignRight | Qt.AlignTop
+
+PREVIEW_INTERVAL = 0.25  # 提取过程中发送预览行的最小间隔（秒）
+
+class ExtractionWorker(QThread):
+    """在后台线程中提取PDF文本（含OCR）并解析目录，界面线程只负责显示
+
+    已有提取好的文本时只做解析。进度、结果和错误都通过信号送回界面线程，
+    cancel() 之后在下一页开始前停止，并发出 aborted 信号。
+    """
+    progress = pyqtSignal(int, int, str, object)  # (已完成页数, 总页数, 阶段说明, 预计剩余秒数)
+    rows_ready = pyqtSignal(object)  # 提取过程中新生成的预览行（Outline）
+    done = pyqtSignal(object)  # (文本, 目录链接, 大纲)
+    failed = pyqtSignal(str)
+    aborted = pyqtSignal()
+
+    def __init__(self, pdf_path, profile, stats, text=None, link_entries=None, parent=None):
+        super().__init__(parent)
+        self.pdf_path = pdf_path
+        self.profile = profile
+        self.stats = stats
+        self.text = text
+        self.link_entries = link_entries
+        self._cancelled = False
+        self.preview = None
+        self.last_preview = 0.0
+
+    def cancel(self):
+        self._cancelled = True
+
+    def is_cancelled(self):
+        return self._cancelled
+
+    def preview_page(self, page_text):
+        """解析刚提取的一页，距上次发送超过 PREVIEW_INTERVAL 时把新行送给界面"""
+        self.preview.feed(page_text)
+        now = time.perf_counter()
+        if now - self.last_preview >= PREVIEW_INTERVAL:
+            self.last_preview = now
+            batch = self.preview.take_rows()
+            if batch:
+                self.rows_ready.emit(batch)
+
+    def run(self):
+        try:
+            text, link_entries = self.text, self.link_entries
+            if text is None:
+                # 预览用独立的提取器，不计入统计
+                self.preview = OutlinePreview(OutlineExtractor.from_profile(self.profile))
+                extractor = PdfTextExtractor(self.profile, self.stats, self.progress.emit, self.is_cancelled,
+                                             self.preview_page)
+                with self.stats.stage('extract'):
+                    text = extractor.extract(self.pdf_path)
+                link_entries = extractor.link_entries
+            else:
+                self.stats.count('extract', 'cache_hits')
+            if self._cancelled:
+                raise ExtractionCancelled()
             
-            i += 1
+            # 解析用独立的提取器，界面线程在此期间修改设置不会影响本次解析
+            outline_extractor = OutlineExtractor.from_profile(self.profile)
+            outline_extractor.stats = self.stats
+            outline = outline_extractor.parse_document(text, link_entries)
+            self.done.emit((text, link_entries, outline))
+        except ExtractionCancelled:
+            self.aborted.emit()
+        except Exception as e:
+            logger.exception("提取失败")
+            self.failed.emit(str(e))
 
-        # 确保最后一行也被添加
-        if any(current_entry):
-            outline.append(current_entry)
+class PatternCheckWorker(QThread):
+    """在后台线程中做正则安全检查（见 check_pattern_safety），子进程启动和探测期间界面不卡"""
+    passed = pyqtSignal(object)  # 静态检查的提示
+    rejected = pyqtSignal(str)
 
-        # 打印匹配结果
-        print(f"总共找到 {match_count} 个匹配的标题行")
-        print(f"总共生成 {len(outline)} 行大纲数据")
-        
-        # 移除明显是页码的单独条目，但条件放宽
-        filtered_outline = []
-        for entry in outline:
-            # 只有当所有非空元素都只包含数字时才过滤
-            if not all(re.match(r'^\s*\d+\s*$', e) for e in entry if e.strip()):
-                filtered_outline.append(entry)
+    def __init__(self, row, pattern, compiled, sample_lines, parent=None):
+        super().__init__(parent)
+        self.row = row
+        self.pattern = pattern
+        self.compiled = compiled
+        self.sample_lines = sample_lines
 
-        # 打印原始数据
-        print("\n=== 原始提取数据 ===")
-        for row in filtered_outline:
-            print(row)
-        print("=== 原始数据结束 ===\n")
+    def run(self):
+        try:
+            self.passed.emit(check_pattern_safety(self.pattern, self.sample_lines))
+        except PatternSafetyError as e:
+            self.rejected.emit(str(e))
+        except Exception as e:
+            logger.exception("正则安全检查失败")
+            self.rejected.emit(str(e))
 
-        return filtered_outline
+class SweepWorker(QThread):
+    """在后台线程中用多个候选配置解析同一份文本并打分（见 sweep_profiles）"""
+    done = pyqtSignal(object)  # (得分最高的大纲, 评分表)
+    failed = pyqtSignal(str)
 
-    def _deduplicate(self, outline):
-        last_values = {}
-        cleaned = []
-        for entry in outline:
-            new_entry = []
-            for idx, value in enumerate(entry):
-                if value == last_values.get(idx):
-                    new_entry.append("")
-                else:
-                    new_entry.append(value)
-                    last_values[idx] = value
-            cleaned.append(new_entry)
-        return cleaned
+    def __init__(self, text, profiles, workers=None, parent=None):
+        super().__init__(parent)
+        self.text = text
+        self.profiles = list(profiles)
+        self.workers = workers
 
-class KeywordDialog(QDialog):
-    def __init__(self, parent=None, keywords=None):
+    def run(self):
+        try:
+            self.done.emit(sweep_profiles(self.text, self.profiles, self.workers))
+        except Exception as e:
+            logger.exception("比较配置失败")
+            self.failed.emit(str(e))
+
+BATCH_INDEX_TITLE = "汇总"
+BATCH_INDEX_HEADERS = ["文件", "工作表", "目录条目数", "扫描页数", "OCR页数", "提取耗时（秒）", "备注"]
+BATCH_INDEX_WIDTHS = [40, 24, 12, 10, 10, 14, 40]
+
+class BatchExportWorker(QThread):
+    """批量导出：按同一配置逐个提取PDF，每完成一个就写出一个工作表
+
+    工作簿以只写模式流式写出，每个文件的大纲写完即丢弃，内存不随文件数增长。
+    最前面的汇总表先建立，每完成一个文件追加一行：文件、条目数、扫描页数、
+    OCR页数和提取耗时。单个文件失败时在汇总表中记下原因，继续处理其余文件。
+    """
+    progress = pyqtSignal(int, int, str, object)  # (已完成页数, 总页数, 阶段说明, 预计剩余秒数)
+    done = pyqtSignal(object)  # (保存路径, 成功文件数, 失败文件数)
+    failed = pyqtSignal(str)
+    aborted = pyqtSignal()
+
+    def __init__(self, pdf_paths, save_path, profile, merged=False, vertical_center=False, parent=None):
         super().__init__(parent)
-        self.keywords = keywords or set()
-        self.init_ui()
-        
-    def init_ui(self):
-        self.setWindowTitle("关键词屏蔽配置")
-        layout = QVBoxLayout()
-        
-        # 说明标签
-        tip_label = QLabel("请输入需要屏蔽的关键词，每行一个：")
-        layout.addWidget(tip_label)
-        
-        # 关键词输入框
-        self.keyword_input = QTextEdit()
-        self.keyword_input.setPlaceholderText("在此输入关键词，每行一个")
-        # 设置现有的关键词
-        self.keyword_input.setText("\n".join(sorted(self.keywords)))
-        layout.addWidget(self.keyword_input)
-        
-        # 按钮布局
-        btn_layout = QHBoxLayout()
-        
-        # 确定按钮
-        self.ok_button = QPushButton("确定")
-        self.ok_button.clicked.connect(self.accept)
-        btn_layout.addWidget(self.ok_button)
+        self.pdf_paths = list(pdf_paths)
+        self.save_path = save_path
+        self.profile = profile
+        self.merged = merged
+        self.vertical_center = vertical_center
+        self._cancelled = False
+
+    def cancel(self):
+        self._cancelled = True
+
+    def is_cancelled(self):
+        return self._cancelled
+
+    def run(self):
+        try:
+            writer = OutlineWorkbookWriter()
+            # 汇总表最先建立，排在所有文件的工作表之前，各工作表单独写临时文件，可以交替追加
+            index = writer.workbook.create_sheet(BATCH_INDEX_TITLE)
+            for col, width in enumerate(BATCH_INDEX_WIDTHS, 1):
+                index.column_dimensions[openpyxl.utils.get_column_letter(col)].width = width
+            index.append(BATCH_INDEX_HEADERS)
+            used_titles = {BATCH_INDEX_TITLE.lower()}
+            failures = 0
+            for number, pdf_path in enumerate(self.pdf_paths, 1):
+                name = os.path.basename(pdf_path)
+                try:
+                    summary = self.export_file(writer, number, pdf_path, used_titles)
+                except ExtractionCancelled:
+                    raise
+                except Exception as e:
+                    logger.exception("批量导出 %s 失败", pdf_path)
+                    failures += 1
+                    summary = [name, None, None, None, None, None, f"失败：{e}"]
+                index.append(summary)
+            if self._cancelled:
+                raise ExtractionCancelled()
+            writer.save(self.save_path)
+            self.done.emit((self.save_path, len(self.pdf_paths) - failures, failures))
+        except ExtractionCancelled:
+            self.aborted.emit()
+        except Exception as e:
+            logger.exception("批量导出失败")
+            self.failed.emit(str(e))
+
+    def export_file(self, writer, number, pdf_path, used_titles):
+        """提取一个文件并写出它的工作表，返回汇总表中的一行"""
+        name = os.path.basename(pdf_path)
+        prefix = f"[{number}/{len(self.pdf_paths)}] {name}"
         
-        # 取消按钮
-        self.cancel_button = QPushButton("取消")
-        self.cancel_button.clicked.connect(self.reject)
-        btn_layout.addWidget(self.cancel_button)
+        def progress(done, total, label, eta):
+            self.progress.emit(done, total, f"{prefix} {label}", eta)
         
-        layout.addLayout(btn_layout)
-        self.setLayout(layout)
+        start = time.perf_counter()
+        stats = Instrumentation()
+        extractor = PdfTextExtractor(self.profile, stats, progress, self.is_cancelled)
+        with stats.stage('extract'):
+            text = extractor.extract(pdf_path)
+        outline_extractor = OutlineExtractor.from_profile(self.profile)
+        outline_extractor.stats = stats
+        outline = outline_extractor.parse_document(text, extractor.link_entries)
+        seconds = time.perf_counter() - start
         
-        # 设置对话框大小
-        self.resize(400, 300)
-    
-    def get_keywords(self):
-        """获取输入的关键词列表"""
-        text = self.keyword_input.toPlainText()
-        return {line.strip() for line in text.split('\n') if line.strip()}
+        level_count = len(outline_extractor.level_configs)
+        has_pages = outline.has_pages()
+        if self.merged:
+            rows, spans = outline, merge_spans(outline, level_count)
+        else:
+            rows, spans = outline_extractor._deduplicate(outline), None
+        title = excel_sheet_title(os.path.splitext(name)[0], used_titles)
+        writer.write_sheet(outline_headers(level_count, has_pages), rows, level_count,
+                           [outline.pages, outline.pdf_pages] if has_pages else (),
+                           spans, self.merged and self.vertical_center, title)
+        # 与单文件提取一样，设置了 PDF2EXCEL_STATS 时每个文件追加一条统计
+        stats_path = os.environ.get('PDF2EXCEL_STATS')
+        if stats_path:
+            try:
+                stats.dump(stats_path, file=pdf_path, sheet=title)
+            except OSError as e:
+                logger.warning("写入统计文件失败: %s", e)
+        return [name, title, len(outline), stats.counters['extract'].get('pages', 0),
+                stats.counters['ocr'].get('pages', 0), round(seconds, 2), None]
 
 class MainWindow(QMainWindow):
     def __init__(self):
@@ -460,16 +2755,25 @@ class MainWindow(QMainWindow):
         self.samples = []
         self.space_required = []  # 存储每个层级是否需要空格匹配
         self.extractor = OutlineExtractor()
+        self.worker = None  # 正在运行的后台提取
+        self.batch_worker = None  # 正在运行的批量导出
+        self.sweep_worker = None  # 正在运行的配置比较
+        self.pattern_checks = {}  # 行号 -> 该行最新一次正则安全检查
+        self.running_checks = set()  # 尚未结束的正则安全检查，包括已被同一行新检查取代的
+        self.pending_extract = False  # 提取过程中设置有变化，结束后重新提取
         
         # 设置应用图标
         icon_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'pdf.ico')
         if os.path.exists(icon_path):
             self.setWindowIcon(QIcon(icon_path))
         
+        # 窗口缩放、选项修改等连续操作合并为一次布局或解析
+        self.scheduler = CoalescingScheduler(self)
+        
         self.init_ui()
         self.center_window()
-        # 添加一个计时器来延迟执行刷新操作
-        QTimer.singleShot(100, self.refresh_tables_layout)
+        # 延迟执行刷新操作
+        self.schedule_relayout()
     
     def center_window(self):
         # 获取屏幕尺寸
@@ -520,6 +2824,12 @@ class MainWindow(QMainWindow):
         self.btn_add.clicked.connect(self.add_samples)
         sample_btn_layout.addWidget(self.btn_add)
         
+        self.btn_infer = QPushButton("自动识别样本")
+        self.btn_infer.setToolTip("根据已打开PDF中的编号格式推断目录层级样本")
+        self.btn_infer.setStyleSheet("padding: 5px 15px;")
+        self.btn_infer.clicked.connect(self.auto_infer_samples)
+        sample_btn_layout.addWidget(self.btn_infer)
+        
         # 样本展示区域
         sample_list_container = QWidget()
         sample_list_layout = QHBoxLayout()
@@ -603,6 +2913,11 @@ class MainWindow(QMainWindow):
         self.btn_file.setStyleSheet("padding: 5px 15px;")
         self.btn_file.clicked.connect(self.select_file)
         btn_layout.addWidget(self.btn_file)
+        self.btn_cancel_extract = QPushButton("取消提取")
+        self.btn_cancel_extract.setStyleSheet("padding: 5px 15px;")
+        self.btn_cancel_extract.clicked.connect(self.cancel_extraction)
+        self.btn_cancel_extract.hide()
+        btn_layout.addWidget(self.btn_cancel_extract)
         layout.addLayout(btn_layout)
 
         # 添加进度条
@@ -643,6 +2958,37 @@ class MainWindow(QMainWindow):
         self.colon_truncate_checkbox.setChecked(True)
         self.colon_truncate_checkbox.stateChanged.connect(self.on_colon_truncate_changed)
         left_options.addWidget(self.colon_truncate_checkbox)
+
+        # 序号连续性过滤：宽松的模式也能得到干净的目录
+        self.sequence_filter_checkbox = QCheckBox("序号连续性过滤")
+        self.sequence_filter_checkbox.setChecked(False)
+        self.sequence_filter_checkbox.setToolTip("每个层级只保留编号连续的最长序列，去除正文、表格、页脚中的误匹配")
+        self.sequence_filter_checkbox.stateChanged.connect(self.on_sequence_filter_changed)
+        left_options.addWidget(self.sequence_filter_checkbox)
+
+        self.remove_headers_checkbox = QCheckBox("去除页眉页脚")
+        self.remove_headers_checkbox.setChecked(True)
+        self.remove_headers_checkbox.setToolTip("解析前去除在大多数页面顶部或底部重复出现的行（页眉、页脚、页码）")
+        self.remove_headers_checkbox.stateChanged.connect(self.on_remove_headers_changed)
+        left_options.addWidget(self.remove_headers_checkbox)
+
+        self.dedupe_rows_checkbox = QCheckBox("去除重复条目")
+        self.dedupe_rows_checkbox.setChecked(False)
+        self.dedupe_rows_checkbox.setToolTip("内容相同的目录行只保留第一次出现的（目录与正文标题重复、简目与详目重复）")
+        self.dedupe_rows_checkbox.stateChanged.connect(self.on_dedupe_rows_changed)
+        left_options.addWidget(self.dedupe_rows_checkbox)
+
+        self.use_links_checkbox = QCheckBox("按目录链接提取")
+        self.use_links_checkbox.setChecked(False)
+        self.use_links_checkbox.setToolTip("PDF目录可点击跳转时，直接读取目录链接的文字和目标页，页码准确；没有目录链接时仍按文本提取")
+        self.use_links_checkbox.stateChanged.connect(self.on_use_links_changed)
+        left_options.addWidget(self.use_links_checkbox)
+
+        self.geometry_pages_checkbox = QCheckBox("按位置识别页码")
+        self.geometry_pages_checkbox.setChecked(False)
+        self.geometry_pages_checkbox.setToolTip("根据文字位置识别行末右对齐的页码并去掉各种引导线（……、···），标题中的数字不会被误删；需要重新提取文本")
+        self.geometry_pages_checkbox.stateChanged.connect(self.on_geometry_pages_changed)
+        left_options.addWidget(self.geometry_pages_checkbox)
         
         left_options.addStretch()
 
@@ -656,6 +3002,22 @@ class MainWindow(QMainWindow):
         self.keyword_config_btn.setMinimumWidth(110)  # 设置最小宽度
         right_options.addWidget(self.keyword_config_btn)
         
+        # 配置文件：批处理与界面共用同一份提取配置
+        self.save_profile_btn = QPushButton("保存配置")
+        self.save_profile_btn.setToolTip("把目录样本、正则和各项选项保存为配置文件")
+        self.save_profile_btn.clicked.connect(self.save_profile)
+        right_options.addWidget(self.save_profile_btn)
+        
+        self.load_profile_btn = QPushButton("加载配置")
+        self.load_profile_btn.setToolTip("从配置文件恢复目录样本、正则和各项选项")
+        self.load_profile_btn.clicked.connect(self.load_profile)
+        right_options.addWidget(self.load_profile_btn)
+        
+        self.compare_profiles_btn = QPushButton("比较配置")
+        self.compare_profiles_btn.setToolTip("选择多个配置文件，在当前PDF上逐一评分并采用得分最高的配置")
+        self.compare_profiles_btn.clicked.connect(self.compare_profiles)
+        right_options.addWidget(self.compare_profiles_btn)
+        
         if HAS_TESSERACT:            
             self.ocr_settings_btn = QPushButton("OCR 设置")
             self.ocr_settings_btn.setToolTip("配置Tesseract路径和选项")
@@ -675,9 +3037,19 @@ class MainWindow(QMainWindow):
         bottom_options.addLayout(right_options)
 
         # 结果显示
-        self.result_table = QTableWidget()
-        self.result_table.setColumnCount(1)
-        self.result_table.setHorizontalHeaderLabels(["待选择PDF并提取目录、设置显示格式后，可双击单元格编辑提取结果，拖动或点击单个或按住 Ctrl 多选单元格以删除对应行。"])
+        self.result_table = QTableView()
+        self.result_model = OutlineTableModel(self)
+        self.result_model.set_outline([], [], 0, ["待选择PDF并提取目录、设置显示格式后，可双击单元格编辑提取结果，拖动或点击单个或按住 Ctrl 多选单元格以删除对应行。"])
+        self.result_table.setModel(self.result_model)
+        self.result_delegate = OutlineItemDelegate(self.result_table)
+        self.result_table.setItemDelegate(self.result_delegate)
+        self.result_model.edited.connect(self.on_result_edited)
+        self.text_metrics = TextMetricsCache(self.result_table.fontMetrics())
+        self.sized_rows = bytearray()  # 已按当前列宽计算过行高的行
+        self.result_table.verticalHeader().setDefaultSectionSize(MIN_ROW_HEIGHT)
+        # 行高只为可见区域附近的行计算，滚动时再补算新露出的行
+        self.result_table.verticalScrollBar().valueChanged.connect(self.adjust_visible_row_heights)
+        self.result_model.rowsRemoved.connect(self.on_result_edited)
         self.result_table.setVerticalScrollBarPolicy(Qt.ScrollBarAlwaysOn)
         header = self.result_table.horizontalHeader()
         header.setSectionResizeMode(QHeaderView.Interactive)
@@ -685,10 +3057,9 @@ class MainWindow(QMainWindow):
         viewport_width = self.calculate_table_viewport_width()
         if viewport_width > 0:
             self.result_table.setColumnWidth(0, viewport_width - 20)  # 减去滚动条宽度
-        self.result_table.setStyleSheet("QTableWidget::item { padding: 5px; }")
+        self.result_table.setStyleSheet("QTableView::item { padding: 5px; }")
         self.result_table.setContextMenuPolicy(Qt.CustomContextMenu)
         self.result_table.customContextMenuRequested.connect(self.show_result_context_menu)
-        self.result_table.itemDoubleClicked.connect(self.edit_result_item)
 
         # 保存按钮
         self.btn_save = QPushButton("保存到 Excel")
@@ -696,11 +3067,21 @@ class MainWindow(QMainWindow):
         self.btn_save.setStyleSheet("padding: 5px 15px;")
         self.btn_save.clicked.connect(self.save_to_excel)
         self.btn_save.setEnabled(False)
+        
+        # 批量导出按钮：多个PDF按当前设置导出到同一个工作簿
+        self.btn_batch_export = QPushButton("批量导出多个 PDF")
+        self.btn_batch_export.setStyleSheet("padding: 5px 15px;")
+        self.btn_batch_export.clicked.connect(self.batch_export)
+        self.btn_batch_export.setEnabled(False)
+        save_layout = QHBoxLayout()
+        save_layout.setSpacing(10)
+        save_layout.addWidget(self.btn_save)
+        save_layout.addWidget(self.btn_batch_export)
 
         # 添加所有组件到主布局
         layout.addLayout(bottom_options)
         layout.addWidget(self.result_table)
-        layout.addWidget(self.btn_save)
+        layout.addLayout(save_layout)
         
         main_widget.setLayout(layout)
     
@@ -763,6 +3144,23 @@ class MainWindow(QMainWindow):
         # 更新样本列表
         self.update_sample_list()
     
+    def auto_infer_samples(self):
+        """根据已提取的文本自动生成目录样本，替换现有样本后重新解析一次"""
+        if not hasattr(self, 'extracted_text'):
+            QMessageBox.warning(self, "错误", "请先选择PDF文件")
+            return
+        
+        normalize = self.extractor.normalizer.normalize if self.extractor.normalize_text else None
+        samples, space_required = infer_samples(self.extracted_text.split("\n"), normalize=normalize)
+        if not samples:
+            QMessageBox.information(self, "未识别到样本", "文档中没有找到足够多的编号标题，请手动输入目录样本")
+            return
+        
+        self.samples = samples
+        self.space_required = space_required
+        self.update_sample_list()
+        self.extract_outline()
+    
     def select_file(self):
         file_path, _ = QFileDialog.getOpenFileName(
             self, "选择PDF文件", "", "PDF文件 (*.pdf)")
@@ -774,247 +3172,131 @@ class MainWindow(QMainWindow):
             # 自动开始提取目录
             self.extract_outline()
     
+    def schedule_extract(self):
+        """选项或正则修改后稍后重新提取，短时间内的多次修改只解析一次"""
+        self.scheduler.schedule('extract', self.extract_outline, REPARSE_DELAY_MS)
+    
     def extract_outline(self):
-        """提取目录"""
+        """提取目录：文本提取、OCR和解析在后台线程中进行，完成后显示结果"""
+        # 直接提取时，尚未执行的延迟请求已经没有意义
+        self.scheduler.cancel('extract')
         if not hasattr(self, 'current_file'):
             QMessageBox.warning(self, "错误", "请先选择PDF文件")
             return
         
-        try:
-            # 显示进度条
-            self.progress_bar.show()
-            self.progress_bar.setValue(0)
-            
-            # 禁用所有控件，防止用户操作
-            self.setEnabled(False)
-            QApplication.processEvents()
-            
-            try:
-                # 如果还没有提取过文本，则提取文本
-                if not hasattr(self, 'extracted_text'):
-                    # 使用PyMuPDF提取文本，更好地支持多栏结构
-                    text = self.extract_text_with_pymupdf(self.current_file)
-                    self.extracted_text = text
-                
-                # 解析目录
-                outline = self.extractor.parse_text(self.extracted_text)
-                
-                # 显示结果
-                self.show_results(outline)
-                
-            finally:
-                # 完成后隐藏进度条并重新启用控件
-                self.progress_bar.hide()
-                self.setEnabled(True)
-            
-        except Exception as e:
-            self.progress_bar.hide()
-            self.setEnabled(True)
-            QMessageBox.critical(self, "错误", f"提取失败：{str(e)}")
-    
-    def extract_text_with_pymupdf(self, pdf_path):
-        """使用PyMuPDF提取PDF文本，支持多栏结构"""
-        try:
-            doc = fitz.open(pdf_path)
-            text = ""
-            total_pages = len(doc)
-            
-            # 检查是否开启强制OCR模式
-            force_ocr = hasattr(self, 'force_ocr_checkbox') and self.force_ocr_checkbox.isChecked()
-            
-            # 更新进度条标题
-            if force_ocr and HAS_TESSERACT:
-                self.progress_bar.setFormat("OCR识别PDF中: %p%")
-            else:
-                self.progress_bar.setFormat("提取文本中: %p%")
-            
-            for i, page in enumerate(doc):
-                # 获取页面尺寸信息
-                width, height = page.rect.width, page.rect.height
-                
-                # 根据模式选择提取方法
-                if not force_ocr:
-                    # 正常模式：直接提取文本
-                    page_text = page.get_text("text")
-                    
-                    # 检测是否需要OCR (如果页面没有文本或文本极少)
-                    if len(page_text.strip()) < 20 and HAS_TESSERACT:
-                        try:
-                            # 尝试OCR处理
-                            # 对大页面降低DPI
-                            if width * height > 1000000:  # 超过100万平方点
-                                matrix = fitz.Matrix(150/72, 150/72)  # 使用较低DPI
-                            else:
-                                matrix = fitz.Matrix(300/72, 300/72)  # 默认300 DPI
-                                
-                            pix = page.get_pixmap(matrix=matrix)
-                            img = Image.open(io.BytesIO(pix.tobytes()))
-                            
-                            # 处理超大图像
-                            img_width, img_height = img.size
-                            if img_width * img_height > 20000000:  # 2千万像素
-                                scale = min(1.0, 4000 / max(img_width, img_height))
-                                new_width = int(img_width * scale)
-                                new_height = int(img_height * scale)
-                                img = img.resize((new_width, new_height), Image.LANCZOS)
-                            
-                            # 使用中文+英文识别，提高准确率
-                            ocr_text = pytesseract.image_to_string(
-                                img, 
-                                lang='chi_sim+eng',
-                                config='--psm 1 --oem 3'  # 自动页面分割，使用LSTM引擎
-                            )
-                            
-                            if ocr_text and len(ocr_text.strip()) > len(page_text.strip()):
-                                page_text = ocr_text
-                                print(f"第{i+1}页使用OCR结果，识别到{len(ocr_text.strip())}个字符")
-                        except Exception as e:
-                            print(f"第{i+1}页OCR处理失败: {e}")
-                else:
-                    # 强制OCR模式：对每一页使用OCR
-                    if HAS_TESSERACT:
-                        try:
-                            # 更新进度条
-                            self.progress_bar.setFormat(f"OCR识别第{i+1}/{total_pages}页: %p%")
-                            QApplication.processEvents()
-                            
-                            # 对特别大的页面使用较低DPI
-                            if width * height > 1000000:  # 超过100万平方点
-                                matrix = fitz.Matrix(150/72, 150/72)  # 使用低DPI
-                                print(f"页面{i+1}较大({width:.0f}x{height:.0f})，使用低DPI(150)")
-                            else:
-                                matrix = fitz.Matrix(300/72, 300/72)  # 默认300 DPI
-                            
-                            # 获取图像
-                            pix = page.get_pixmap(matrix=matrix)
-                            img = Image.open(io.BytesIO(pix.tobytes()))
-                            
-                            # 处理超大图像
-                            img_width, img_height = img.size
-                            if img_width * img_height > 20000000:  # 2千万像素
-                                scale = min(1.0, 3000 / max(img_width, img_height))
-                                new_width = int(img_width * scale)
-                                new_height = int(img_height * scale)
-                                print(f"图像过大({img_width}x{img_height})，缩小至{new_width}x{new_height}")
-                                img = img.resize((new_width, new_height), Image.LANCZOS)
-                            
-                            # 可选：图像预处理
-                            try:
-                                # 对图像进行增强，提高OCR识别率
-                                if img.mode != 'RGB':
-                                    img = img.convert('L')  # 转为灰度
-                                    
-                                    # 使用PIL进行图像增强
-                                    from PIL import ImageFilter, ImageEnhance
-                                    
-                                    # 锐化
-                                    img = img.filter(ImageFilter.SHARPEN)
-                                    
-                                    # 增强对比度
-                                    enhancer = ImageEnhance.Contrast(img)
-                                    img = enhancer.enhance(2.0)
-                                    
-                                    # 保存处理后的图像用于调试
-                                    debug_dir = os.path.join(os.path.dirname(pdf_path), "debug_ocr")
-                                    os.makedirs(debug_dir, exist_ok=True)
-                                    debug_file = os.path.join(debug_dir, f"page_{i+1}.png")
-                                    img.save(debug_file)
-                                    print(f"已保存处理后图像: {debug_file}")
-                            except Exception as e:
-                                print(f"图像增强失败: {e}")
-                            
-                            # 尝试多种OCR配置
-                            best_text = ""
-                            best_len = 0
-                            ocr_configs = [
-                                '--psm 1 --oem 3',  # 自动分页
-                                '--psm 6 --oem 3',  # 单文本块
-                            ]
-                            
-                            for config in ocr_configs:
-                                try:
-                                    temp_text = pytesseract.image_to_string(
-                                        img, 
-                                        lang='chi_sim+eng',
-                                        config=config
-                                    )
-                                    if len(temp_text.strip()) > best_len:
-                                        best_text = temp_text
-                                        best_len = len(temp_text.strip())
-                                except Exception as e:
-                                    print(f"OCR配置 {config} 失败: {e}")
-                                    
-                            # 使用最佳结果
-                            page_text = best_text if best_len > 0 else "OCR识别失败"
-                            print(f"第{i+1}页OCR识别完成，识别到{best_len}个字符")
-                        except Exception as e:
-                            page_text = f"第{i+1}页OCR处理失败: {e}"
-                            print(page_text)
-                    else:
-                        # 没有安装pytesseract，使用普通提取
-                        page_text = page.get_text("text")
-                        if not page_text.strip():
-                            page_text = f"[第{i+1}页没有识别到文本，请安装pytesseract启用OCR]"
-                
-                # 添加页码信息
-                text += f"=== 第{i+1}页 ===\n{page_text}\n"
-                
-                # 更新进度条
-                progress = int((i + 1) / total_pages * 100)
-                self.progress_bar.setValue(progress)
-                QApplication.processEvents()
-            
-            # 如果提取的文本太少且不是强制OCR模式，尝试备用方法
-            if len(text.strip()) < 100 and not force_ocr:
-                # 备用方法：使用pdfplumber
-                return self.extract_text_with_pdfplumber(pdf_path)
-            
-            # 重置进度条格式
-            self.progress_bar.setFormat("处理进度：%p%")
-            
-            return text
-        except Exception as e:
-            print(f"PyMuPDF提取失败: {e}")
-            # 回退到pdfplumber
-            return self.extract_text_with_pdfplumber(pdf_path)
+        # 上一次提取还没结束时先取消，结束后按最新的文件和设置重新提取
+        if self.worker is not None:
+            self.pending_extract = True
+            self.worker.cancel()
+            return
+        
+        stats = self.extractor.stats
+        stats.reset()
+        self.progress_bar.setFormat("处理进度：%p%")
+        self.progress_bar.setValue(0)
+        self.progress_bar.show()
+        self.btn_cancel_extract.show()
+        
+        self.worker = ExtractionWorker(self.current_file, self.current_profile(), stats,
+                                       getattr(self, 'extracted_text', None),
+                                       getattr(self, 'link_entries', None), self)
+        self.worker.progress.connect(self.on_extract_progress)
+        self.worker.rows_ready.connect(self.on_preview_rows)
+        self.preview_shown = False
+        self.worker.done.connect(self.on_extract_done)
+        self.worker.failed.connect(self.on_extract_failed)
+        self.worker.aborted.connect(self.on_extract_aborted)
+        self.worker.finished.connect(self.on_worker_finished)
+        self.worker.finished.connect(self.worker.deleteLater)
+        self.worker.start()
+    
+    def cancel_extraction(self):
+        """取消正在进行的提取和批量导出"""
+        if self.worker is not None:
+            self.pending_extract = False
+            self.worker.cancel()
+        if self.batch_worker is not None:
+            self.batch_worker.cancel()
+    
+    def on_extract_done(self, result):
+        text, link_entries, outline = result
+        if self.pending_extract:
+            return  # 结果已过期，结束后会重新提取
+        profile = self.current_profile()
+        if profile.text_key() != self.worker.profile.text_key():
+            # 提取过程中改了OCR或页码识别方式，文本需要重新提取
+            self.pending_extract = True
+            return
+        self.extracted_text = text
+        self.link_entries = link_entries
+        if profile != self.worker.profile:
+            # 提取过程中改了解析选项，用已提取的文本按新设置重新解析
+            self.pending_extract = True
+            return
+        
+        self.show_results(outline)
+        self.extractor.stats.log_summary()
+        self.dump_stats()
+    
+    def on_preview_rows(self, batch):
+        """提取过程中收到的预览行：第一批替换原有结果，之后追加到表格末尾"""
+        if self.pending_extract:
+            return
+        self.show_results(batch, append=self.preview_shown)
+        self.preview_shown = True
+    
+    def on_extract_failed(self, message):
+        if not self.pending_extract:
+            self.clear_results()
+            QMessageBox.critical(self, "错误", f"提取失败：{message}")
+    
+    def on_extract_aborted(self):
+        logger.info("提取已取消")
+        # 之后不再重新提取时，已显示的预览行或上一次的结果都不完整，不能再被导出
+        if not self.pending_extract:
+            self.clear_results()
+    
+    def on_worker_finished(self):
+        self.worker = None
+        self.progress_bar.hide()
+        self.progress_bar.setFormat("处理进度：%p%")
+        self.btn_cancel_extract.hide()
+        if self.pending_extract:
+            self.pending_extract = False
+            self.extract_outline()
+    
+    def closeEvent(self, event):
+        # 关闭窗口时停止后台提取，避免线程在窗口销毁后继续运行
+        if self.worker is not None:
+            self.pending_extract = False
+            self.worker.cancel()
+            self.worker.wait()
+        if self.batch_worker is not None:
+            self.batch_worker.cancel()
+            self.batch_worker.wait()
+        if self.sweep_worker is not None:
+            self.sweep_worker.wait()
+        # 被取代的检查也可能仍在运行，要等它们全部结束
+        for worker in list(self.running_checks):
+            worker.wait()
+        super().closeEvent(event)
+    
+    def parse_current(self):
+        """用当前设置重新解析已提取的内容"""
+        return self.extractor.parse_document(self.extracted_text, getattr(self, 'link_entries', None))
+    
+    def on_extract_progress(self, done, total, label, eta):
+        eta_text = format_eta(eta)
+        self.progress_bar.setFormat(f"{label}: %p%" + (f"（{eta_text}）" if eta_text else ""))
+        self.progress_bar.setValue(int(done / max(total, 1) * 100))
+    
+    def current_profile(self):
+        """当前界面上的全部设置"""
+        return self.extractor.to_profile(
+            force_ocr=hasattr(self, 'force_ocr_checkbox') and self.force_ocr_checkbox.isChecked(),
+            tesseract_cmd=pytesseract.pytesseract.tesseract_cmd if HAS_TESSERACT else '',
+        )
     
-    def extract_text_with_pdfplumber(self, pdf_path):
-        """使用pdfplumber提取PDF文本(备用方法)"""
-        with pdfplumber.open(pdf_path) as pdf:
-            total_pages = len(pdf.pages)
-            text = ""
-            for i, page in enumerate(pdf.pages):
-                try:
-                    # 尝试按表格提取，这可能有助于保持多栏结构
-                    tables = page.extract_tables()
-                    if tables:
-                        # 处理表格
-                        for table in tables:
-                            for row in table:
-                                text += " | ".join([cell if cell else "" for cell in row]) + "\n"
-                    
-                    # 再提取普通文本
-                    page_text = page.extract_text()
-                    if page_text:
-                        text += page_text + "\n"
-                except Exception as e:
-                    print(f"提取页面 {i+1} 时出错: {e}")
-                    # 尝试基本提取
-                    try:
-                        page_text = page.extract_text()
-                        if page_text:
-                            text += page_text + "\n"
-                    except:
-                        pass
-                
-                # 更新进度条
-                progress = int((i + 1) / total_pages * 100)
-                self.progress_bar.setValue(progress)
-                QApplication.processEvents()
-            
-            text = f"=== 第{i+1}页 ===\n{text}\n"
-            return text
-
     def show_context_menu(self, pos):
         menu = QMenu(self)
         delete_action = menu.addAction("删除选中项")
@@ -1059,14 +3341,15 @@ class MainWindow(QMainWindow):
             # 选中移动后的行
             self.sample_list.selectRow(new_row)
     
-    def update_sample_list(self):
+    def update_sample_list(self, rebuild=True):
         self.sample_list.setRowCount(len(self.samples))
         # 确保space_required列表长度与samples相同
         while len(self.space_required) < len(self.samples):
             self.space_required.append(False)
         
-        # 重新构建配置以获取正则表达式
-        self.extractor.build_configs(self.samples, self.space_required)
+        # 重新构建配置以获取正则表达式（加载配置文件时已有配置，不再重建）
+        if rebuild:
+            self.extractor.build_configs(self.samples, self.space_required)
         
         # 移除旧的信号连接
         try:
@@ -1102,108 +3385,91 @@ class MainWindow(QMainWindow):
         self.sample_list.itemChanged.connect(self.on_item_changed)
         
         self.btn_save.setEnabled(len(self.samples) > 0)
+        self.btn_batch_export.setEnabled(len(self.samples) > 0 and self.batch_worker is None)
     
     def on_item_clicked(self, item):
         if item.column() == 1:  # 空格匹配列
             try:
-                # 如果正在处理中，直接返回
-                if not self.isEnabled():
-                    return
-                    
-                # 显示进度条
-                self.show_progress(True, "更新目录匹配规则")
+                row = item.row()
+                self.space_required[row] = not self.space_required[row]  # 切换状态
+                # 更新显示
+                checkbox_text = "强制" if self.space_required[row] else "不强制"
+                item.setText(checkbox_text)
+                if self.space_required[row]:
+                    item.setBackground(Qt.lightGray)
+                else:
+                    item.setBackground(Qt.white)
                 
-                # 禁用所有控件
-                self.setEnabled(False)
-                self.sample_list.setEnabled(False)  # 特别禁用样本列表
-                QApplication.processEvents()
+                # 重新构建配置
+                self.extractor.build_configs(self.samples, self.space_required)
+                # 更新正则表达式显示，新生成的正则不必再做安全检查
+                pattern = self.extractor.level_configs[-(row+1)]['pattern'].pattern
+                pattern_item = QTableWidgetItem(pattern)
+                pattern_item.setToolTip(pattern)
+                pattern_item.setFlags(pattern_item.flags() | Qt.ItemIsEditable)
+                self.sample_list.blockSignals(True)
+                self.sample_list.setItem(row, 2, pattern_item)
+                self.sample_list.blockSignals(False)
                 
-                try:
-                    # 记录当前的合并状态
-                    was_merged = self.merge_checkbox.isChecked()
-                    if was_merged:
-                        # 临时取消合并状态
-                        self.merge_checkbox.setChecked(False)
-                        QApplication.processEvents()
-                    
-                    row = item.row()
-                    self.space_required[row] = not self.space_required[row]  # 切换状态
-                    # 更新显示
-                    checkbox_text = "强制" if self.space_required[row] else "不强制"
-                    item.setText(checkbox_text)
-                    if self.space_required[row]:
-                        item.setBackground(Qt.lightGray)
-                    else:
-                        item.setBackground(Qt.white)
-                    
-                    self.update_progress(20)
-                    
-                    # 重新构建配置
-                    self.extractor.build_configs(self.samples, self.space_required)
-                    # 更新正则表达式显示
-                    pattern = self.extractor.level_configs[-(row+1)]['pattern'].pattern
-                    pattern_item = QTableWidgetItem(pattern)
-                    pattern_item.setToolTip(pattern)
-                    pattern_item.setFlags(pattern_item.flags() | Qt.ItemIsEditable)
-                    self.sample_list.setItem(row, 2, pattern_item)
-                    
-                    self.update_progress(40)
-                    
-                    # 如果有提取的文本，直接使用现有数据重新解析
-                    if hasattr(self, 'extracted_text'):
-                        # 使用已有的文本重新解析
-                        outline = self.extractor.parse_text(self.extracted_text)
-                        self.update_progress(70)
-                        # 更新结果显示
-                        self.show_results(outline)
-                        
-                        self.update_progress(90)
-                        
-                        # 如果之前是合并状态，恢复合并
-                        if was_merged:
-                            QApplication.processEvents()
-                            self.merge_checkbox.setChecked(True)
-                    
-                    self.update_progress(100)
-                finally:
-                    # 重新启用所有控件
-                    self.setEnabled(True)
-                    self.sample_list.setEnabled(True)
-                    QApplication.processEvents()
-                    # 隐藏进度条
-                    self.show_progress(False)
+                # 重新解析在后台进行，连续点击只解析一次
+                if hasattr(self, 'current_file'):
+                    self.schedule_extract()
             except Exception as e:
-                # 发生错误时确保界面可用
-                self.setEnabled(True)
-                self.sample_list.setEnabled(True)
-                self.show_progress(False)
-                QApplication.processEvents()
                 QMessageBox.warning(self, "错误", f"处理空格匹配状态时发生错误：{str(e)}")
-                # 出错时尝试恢复界面状态
-                if hasattr(self, 'original_outline'):
-                    self.show_results(self.original_outline)
     
     def on_item_changed(self, item):
         if item.column() == 2:  # 正则表达式列
             try:
-                # 尝试编译正则表达式
-                re.compile(item.text())
-                # 如果编译成功，更新配置
-                row = item.row()
-                self.extractor.level_configs[-(row+1)]['pattern'] = re.compile(item.text())
-                # 如果有PDF文件已经打开，重新提取目录
-                if hasattr(self, 'current_file'):
-                    self.extract_outline()
+                # 尝试编译正则表达式，待匹配的行已归一化，模式中的全角字符同样转换
+                pattern_text = item.text()
+                if self.extractor.normalize_text:
+                    pattern_text = self.extractor.normalizer.normalize_pattern(pattern_text)
+                compiled = re.compile(pattern_text)
             except re.error as e:
                 # 如果正则表达式无效，显示错误消息
-                QMessageBox.warning(self, "正则表达式错误", f"输入的正则表达式无效：{str(e)}")
-                # 恢复原来的正则表达式
-                pattern = self.extractor.level_configs[-(item.row()+1)]['pattern'].pattern
-                item.setText(pattern)
+                self.reject_pattern(item.row(), "正则表达式错误", f"输入的正则表达式无效：{str(e)}")
+                return
+            # 检查是否存在灾难性回溯风险，避免整篇文档匹配时界面卡死；探测需要启动子进程，在后台进行
+            sample_lines = self.extracted_text.split("\n") if hasattr(self, 'extracted_text') else ()
+            worker = PatternCheckWorker(item.row(), pattern_text, compiled, sample_lines, self)
+            worker.passed.connect(lambda issues, worker=worker: self.on_pattern_passed(worker))
+            worker.rejected.connect(lambda message, worker=worker: self.on_pattern_rejected(worker, message))
+            worker.finished.connect(lambda worker=worker: self.running_checks.discard(worker))
+            worker.finished.connect(worker.deleteLater)
+            self.pattern_checks[item.row()] = worker
+            self.running_checks.add(worker)
+            worker.start()
+    
+    def on_pattern_passed(self, worker):
+        """检查通过，更新配置并重新提取；同一行之后又改过时忽略这次结果"""
+        if self.pattern_checks.get(worker.row) is not worker:
+            return
+        del self.pattern_checks[worker.row]
+        self.extractor.override_pattern(worker.row + 1, worker.compiled)
+        # 如果有PDF文件已经打开，重新提取目录
+        if hasattr(self, 'current_file'):
+            self.schedule_extract()
+    
+    def on_pattern_rejected(self, worker, message):
+        if self.pattern_checks.get(worker.row) is not worker:
+            return
+        del self.pattern_checks[worker.row]
+        self.reject_pattern(worker.row, "正则表达式风险",
+                            f"输入的正则表达式可能导致程序长时间无响应，已拒绝：\n{message}")
+    
+    def reject_pattern(self, row, title, text):
+        QMessageBox.warning(self, title, text)
+        # 恢复原来的正则表达式，恢复时不再触发校验
+        pattern = self.extractor.level_configs[-(row+1)]['pattern'].pattern
+        item = self.sample_list.item(row, 2)
+        if item is not None:
+            self.sample_list.blockSignals(True)
+            item.setText(pattern)
+            self.sample_list.blockSignals(False)
     
     def show_result_context_menu(self, pos):
         menu = QMenu(self)
-        selected_rows = set(item.row() for item in self.result_table.selectedItems())
+        selected_rows = set(index.row() for index in self.result_table.selectionModel().selectedIndexes())
         
         if len(selected_rows) > 0:
             if len(selected_rows) == 1:
@@ -1214,185 +3480,124 @@ class MainWindow(QMainWindow):
             action = menu.exec_(self.result_table.mapToGlobal(pos))
             
             if action == delete_action:
-                # 从后向前删除行，避免索引变化
-                for row in sorted(selected_rows, reverse=True):
-                    self.result_table.removeRow(row)
+                # 从后向前按连续区间删除行，避免索引变化
+                rows = sorted(selected_rows, reverse=True)
+                end = rows[0]
+                for i, row in enumerate(rows):
+                    if i + 1 == len(rows) or rows[i + 1] != row - 1:
+                        self.result_model.removeRows(row, end - row + 1)
+                        if i + 1 < len(rows):
+                            end = rows[i + 1]
     
-    def edit_result_item(self, item):
-        item.setFlags(item.flags() | Qt.ItemIsEditable)
-    
-    def show_results(self, outline):
-        """显示提取结果"""
+    def show_results(self, outline, append=False):
+        """显示提取结果，append 为 True 时把这批行追加到已显示的结果之后，不重建表格"""
         try:
             if not outline:
+                # 提取结果为空时清空表格，之前显示的预览行不能留下来被导出
+                if not append:
+                    self.clear_results()
                 return
 
-            # 显示进度条
-            self.show_progress(True, "更新显示结果")
-            
+            render_start = time.perf_counter()
+            if append and getattr(self, 'original_outline', None):
+                self.append_results(outline)
+                self.extractor.stats.add_time('render', time.perf_counter() - render_start)
+                return
             # 保存原始数据用于后续操作
             self.original_outline = outline
             # 保存去重后的数据
             self.deduped_outline = self.extractor._deduplicate(outline)
             
-            self.update_progress(10)
-
-            # 暂时阻止表格更新以提高性能
-            self.result_table.setUpdatesEnabled(False)
-            self.sample_list.setUpdatesEnabled(False)
+            self.populate_result_table()
             
-            try:
-                self.result_table.clear()
-                self.result_table.setColumnCount(len(self.samples))
-                self.result_table.setHorizontalHeaderLabels([f"{convert_to_chinese_num(i+1)}级目录" for i in range(len(self.samples))])
-                
-                self.update_progress(20)
-                
-                # 设置列宽模式
-                header = self.result_table.horizontalHeader()
-                for i in range(self.result_table.columnCount()):
-                    header.setSectionResizeMode(i, QHeaderView.Interactive)
-                
-                # 设置初始列宽
-                if not self.auto_width_checkbox.isChecked():
-                    self.adjust_equal_column_widths()
-                
-                self.update_progress(30)
-
-                if self.merge_checkbox.isChecked():
-                    # 使用原始数据进行合并显示
-                    self.result_table.setRowCount(len(self.original_outline))
-                    total_rows = len(self.original_outline)
-                    # 填充数据
-                    for row, entry in enumerate(self.original_outline):
-                        for col, value in enumerate(entry):
-                            item = QTableWidgetItem(value)
-                            if self.vertical_center_checkbox.isChecked():
-                                item.setTextAlignment(Qt.AlignLeft | Qt.AlignVCenter)
-                            else:
-                                item.setTextAlignment(Qt.AlignLeft | Qt.AlignTop)
-                            self.result_table.setItem(row, col, item)
-                        # 更新填充数据的进度
-                        self.update_progress(30 + int((row / total_rows) * 30))
-
-                    # 处理合并
-                    total_cols = self.result_table.columnCount()
-                    for col in range(total_cols):
-                        row = 0
-                        while row < self.result_table.rowCount():
-                            # 更新合并进度
-                            self.update_progress(60 + int((col / total_cols) * 30))
-                            
-                            # 获取当前单元格的值
-                            current_item = self.result_table.item(row, col)
-                            if not current_item:
-                                row += 1
-                                continue
-                            
-                            current_value = current_item.text().strip()
-                            if not current_value:
-                                row += 1
-                                continue
-                            
-                            # 找到可以合并的行范围
-                            merge_start = row
-                            merge_count = 1
-                            next_row = row + 1
-                            
-                            # 检查后续行是否可以合并
-                            while next_row < self.result_table.rowCount():
-                                # 检查所有前面的列是否相同
-                                can_merge = True
-                                for prev_col in range(col):
-                                    prev_current = self.result_table.item(merge_start, prev_col)
-                                    prev_next = self.result_table.item(next_row, prev_col)
-                                    if (prev_current and prev_current.text().strip()) != (prev_next and prev_next.text().strip()):
-                                        can_merge = False
-                                        break
-                                
-                                if not can_merge:
-                                    break
-                                    
-                                # 检查当前列的值是否相同
-                                next_item = self.result_table.item(next_row, col)
-                                next_value = next_item.text().strip() if next_item else ''
-                                
-                                if next_value == current_value:
-                                    merge_count += 1
-                                    next_row += 1
-                                else:
-                                    break
-                            
-                            # 如果找到可以合并的行
-                            if merge_count > 1:
-                                try:
-                                    # 设置合并
-                                    self.result_table.setSpan(merge_start, col, merge_count, 1)
-                                    # 设置合并后的单元格样式
-                                    merged_item = QTableWidgetItem(current_value)
-                                    if self.vertical_center_checkbox.isChecked():
-                                        merged_item.setTextAlignment(Qt.AlignLeft | Qt.AlignVCenter)
-                                    else:
-                                        merged_item.setTextAlignment(Qt.AlignLeft | Qt.AlignTop)
-                                    self.result_table.setItem(merge_start, col, merged_item)
-                                except Exception as e:
-                                    print(f"设置合并单元格时出错: {str(e)}")
-                                
-                            row = merge_start + merge_count
-                else:
-                    # 直接显示去重后的数据
-                    self.result_table.setRowCount(len(self.deduped_outline))
-                    total_rows = len(self.deduped_outline)
-                    for row, entry in enumerate(self.deduped_outline):
-                        for col, value in enumerate(entry):
-                            item = QTableWidgetItem(value)
-                            item.setTextAlignment(Qt.AlignLeft | Qt.AlignTop)
-                            self.result_table.setItem(row, col, item)
-                        # 更新进度
-                        self.update_progress(60 + int((row / total_rows) * 30))
-
-                # 自动调整行高
-                self.adjust_row_heights()
-                
-                # 恢复表格更新
-                self.result_table.setUpdatesEnabled(True)
-                self.sample_list.setUpdatesEnabled(True)
-                QApplication.processEvents()
-                
-                # 在表格完全加载后，如果启用了自适应列宽，重新调整列宽
-                if self.auto_width_checkbox.isChecked():
-                    QTimer.singleShot(100, self.adjust_auto_column_widths)  # 延迟100ms执行
-                
-                self.update_progress(100)
-                
-            finally:
-                # 确保表格可以更新
-                self.result_table.setUpdatesEnabled(True)
-                self.sample_list.setUpdatesEnabled(True)
-                QApplication.processEvents()
-                # 隐藏进度条
-                self.show_progress(False)
+            # 在表格完全加载后，如果启用了自适应列宽，重新调整列宽
+            if self.auto_width_checkbox.isChecked():
+                self.schedule_relayout()
+            
+            self.extractor.stats.count('render', 'rows', len(outline))
+            self.extractor.stats.add_time('render', time.perf_counter() - render_start)
                 
         except Exception as e:
-            self.show_progress(False)
             QMessageBox.warning(self, "错误", f"显示结果时出错：{str(e)}")
-            # 确保表格可以更新
-            self.result_table.setUpdatesEnabled(True)
-            self.sample_list.setUpdatesEnabled(True)
+
+    def clear_results(self):
+        """清空结果表格和保存的大纲"""
+        self.original_outline = Outline()
+        self.deduped_outline = []
+        self.populate_result_table()
+
+    def append_results(self, batch):
+        """在结果末尾追加一批行：去重接着已有的最后一行计算，合并区域和行高只补算新增部分"""
+        model = self.result_model
+        seed = model.merged_rows[-1:]
+        deduped = self.extractor._deduplicate(seed + list(batch))[len(seed):]
+        for row, page, pdf_page in zip(batch, batch.pages, batch.pdf_pages):
+            self.original_outline.append_row(row, page, pdf_page)
+        self.deduped_outline.extend(deduped)
+        has_pages = model.has_pages()
+        model.append_rows(batch, deduped, batch.pages if has_pages else None, batch.pdf_pages if has_pages else None)
+        
+        if self.merge_checkbox.isChecked():
+            self.apply_merge_spans()
+        self.sized_rows.extend(bytes(len(batch)))
+        self.adjust_visible_row_heights()
+        if self.auto_width_checkbox.isChecked():
+            self.schedule_relayout()
+
+    def populate_result_table(self):
+        """把当前大纲装入结果模型，合并和不合并两种显示的数据一起装入"""
+        outline = self.original_outline
+        merged = self.merge_checkbox.isChecked()
+        # 页码列与行一一对应，不参与去重与合并
+        has_pages = isinstance(outline, Outline) and outline.has_pages()
+        self.result_table.clearSpans()
+        self.result_model.set_outline(
+            outline, self.deduped_outline, len(self.samples), self.result_headers(has_pages),
+            outline.pages if has_pages else None, outline.pdf_pages if has_pages else None, merged)
+        self.result_delegate.vertical_center = merged and self.vertical_center_checkbox.isChecked()
+        
+        header = self.result_table.horizontalHeader()
+        for i in range(self.result_model.columnCount()):
+            header.setSectionResizeMode(i, QHeaderView.Interactive)
+        if not self.auto_width_checkbox.isChecked():
+            self.adjust_equal_column_widths()
+        
+        if merged:
+            self.apply_merge_spans()
+        
+        # 自动调整行高
+        self.adjust_row_heights()
+
+    def apply_merge_spans(self):
+        """按模型计算出的合并区域一次性设置表格合并"""
+        self.result_table.clearSpans()
+        for row, col, count in self.result_model.merge_spans():
+            self.result_table.setSpan(row, col, count, 1)
+
+    def on_result_edited(self, *args):
+        """编辑或删除结果后重新计算合并区域和行高，显示与导出保持一致"""
+        if self.merge_checkbox.isChecked():
+            self.apply_merge_spans()
+        self.adjust_row_heights()
+
+    def result_headers(self, has_pages=None):
+        if has_pages is None:
+            has_pages = self.result_model.has_pages()
+        return outline_headers(len(self.samples), has_pages)
 
     def adjust_equal_column_widths(self):
         """设置等宽的列宽"""
         viewport_width = self.calculate_table_viewport_width()
         if viewport_width > 0:
             available_width = viewport_width - 20  # 减去滚动条宽度
-            if self.result_table.columnCount() > 1:
+            if self.result_model.columnCount() > 1:
                 # 计算网格线占用的总宽度（每个网格线占2像素）
-                grid_width = (self.result_table.columnCount() - 1) * 2
+                grid_width = (self.result_model.columnCount() - 1) * 2
                 # 计算每列实际可用宽度（使用math.floor确保向下取整）
                 import math
-                column_width = math.floor((available_width - grid_width) / self.result_table.columnCount())
+                column_width = math.floor((available_width - grid_width) / self.result_model.columnCount())
                 # 设置所有列的宽度
-                for i in range(self.result_table.columnCount()):
+                for i in range(self.result_model.columnCount()):
                     self.result_table.setColumnWidth(i, column_width)
             else:
                 # 单列情况：使用全部可用宽度
@@ -1400,224 +3605,82 @@ class MainWindow(QMainWindow):
 
     def adjust_auto_column_widths(self):
         """根据内容自动调整列宽"""
-        for col in range(self.result_table.columnCount()):
-            max_width = 0
+        model = self.result_model
+        metrics = self.text_metrics
+        for col in range(model.columnCount()):
             # 检查表头宽度
-            header_text = self.result_table.horizontalHeaderItem(col).text()
-            header_width = self.result_table.fontMetrics().boundingRect(header_text).width() + 20
-            max_width = max(max_width, header_width)
+            header_text = model.headerData(col, Qt.Horizontal)
+            max_width = metrics.font_metrics.boundingRect(header_text).width() + 20
             
-            # 检查每行该列的内容宽度
-            for row in range(self.result_table.rowCount()):
-                item = self.result_table.item(row, col)
-                if item:
-                    content = item.text()
-                    # 计算文本宽度，考虑中文字符
-                    content_width = 0
-                    for char in content:
-                        if ord(char) > 127:  # 中文字符
-                            content_width += int(self.result_table.fontMetrics().boundingRect(char).width() * 1.1)
-                        else:
-                            content_width += self.result_table.fontMetrics().boundingRect(char).width()
-                    content_width = int(content_width + 20)  # 添加一些padding
-                    max_width = max(max_width, content_width)
+            # 检查每行该列的内容宽度，达到上限后不必再看后面的行
+            for row in range(model.rowCount()):
+                if max_width >= MAX_AUTO_COLUMN_WIDTH:
+                    break
+                content = model.cell_text(row, col)
+                if content:
+                    max_width = max(max_width, metrics.text_width(content) + 20)  # 添加一些padding
             
             # 限制最小和最大宽度，确保是整数
-            max_width = min(max(int(max_width), 100), 400)
+            max_width = min(max(int(max_width), 100), MAX_AUTO_COLUMN_WIDTH)
             self.result_table.setColumnWidth(col, max_width)
+        self.adjust_row_heights()
 
     def adjust_row_heights(self):
-        """自动调整所有行的高度"""
-        for row in range(self.result_table.rowCount()):
-            # 获取当前行中所有单元格的内容高度
-            row_height = 0
-            for col in range(self.result_table.columnCount()):
-                item = self.result_table.item(row, col)
-                if item:
-                    # 获取单元格内容的理想高度
-                    content = item.text()
-                    # 计算文本换行后的高度
-                    font_metrics = self.result_table.fontMetrics()
-                    col_width = self.result_table.columnWidth(col)
-                    text_rect = font_metrics.boundingRect(
-                        0, 0, col_width - 10, 1000,  # 减去一些边距
-                        Qt.TextWordWrap | Qt.AlignLeft | Qt.AlignTop,
-                        content
-                    )
-                    row_height = max(row_height, text_rect.height() + 10)  # 加上一些边距
-            
-            # 设置最小行高
-            row_height = max(row_height, 30)  # 最小30像素
-            self.result_table.setRowHeight(row, row_height)
+        """列宽或内容变化后重新计算行高：先计算可见区域附近的行，其余的行滚动到时再算"""
+        self.sized_rows = bytearray(self.result_model.rowCount())
+        self.adjust_visible_row_heights()
+
+    def adjust_visible_row_heights(self, *args):
+        """计算可见区域及上下 ROW_LAYOUT_MARGIN 行中还没有计算过的行高
+
+        按未去重的完整内容计算，合并与不合并两种显示共用同一组行高，切换时不必重算。
+        """
+        model = self.result_model
+        row_count = model.rowCount()
+        if not row_count:
+            return
+        table = self.result_table
+        first = table.rowAt(0)
+        last = table.rowAt(table.viewport().height() - 1)
+        first = max((first if first >= 0 else 0) - ROW_LAYOUT_MARGIN, 0)
+        last = min((last if last >= 0 else row_count - 1) + ROW_LAYOUT_MARGIN, row_count - 1)
+        
+        metrics = self.text_metrics
+        column_widths = [table.columnWidth(col) - 10 for col in range(model.level_count)]  # 减去一些边距
+        sized_rows = self.sized_rows
+        for row in range(first, last + 1):
+            if sized_rows[row]:
+                continue
+            sized_rows[row] = 1
+            row_height = MIN_ROW_HEIGHT
+            for content, width in zip(model.merged_rows[row], column_widths):
+                if content:
+                    # 计算文本换行后的高度，加上一些边距
+                    row_height = max(row_height, metrics.wrapped_height(content, width) + 10)
+            if table.rowHeight(row) != row_height:
+                table.setRowHeight(row, row_height)
     
     def on_merge_checkbox_changed(self, state):
-        """处理合并单元格复选框状态改变"""
-        try:
-            # 显示进度条
-            self.show_progress(True, "更新表格显示")
-            
-            # 禁用所有控件，防止用户操作
-            self.setEnabled(False)
-            QApplication.processEvents()
-            
-            try:
-                # 启用/禁用竖直居中选项
-                self.vertical_center_checkbox.setEnabled(state == Qt.Checked)
-                
-                # 如果没有数据，直接返回
-                if not hasattr(self, 'original_outline') or not self.original_outline:
-                    return
-                
-                # 清除表格内容和合并状态
-                self.result_table.clearContents()
-                
-                # 取消所有合并
-                for row in range(self.result_table.rowCount()):
-                    for col in range(self.result_table.columnCount()):
-                        try:
-                            if self.result_table.rowSpan(row, col) > 1 or self.result_table.columnSpan(row, col) > 1:
-                                # 在取消合并前保存单元格内容
-                                current_item = self.result_table.item(row, col)
-                                current_text = current_item.text() if current_item else ""
-                                current_alignment = current_item.textAlignment() if current_item else (Qt.AlignLeft | Qt.AlignTop)
-                                
-                                # 取消合并
-                                self.result_table.setSpan(row, col, 1, 1)
-                                
-                                # 恢复单元格内容
-                                if current_text:
-                                    new_item = QTableWidgetItem(current_text)
-                                    new_item.setTextAlignment(current_alignment)
-                                    self.result_table.setItem(row, col, new_item)
-                        except Exception as e:
-                            print(f"取消合并单元格时出错 ({row}, {col}): {str(e)}")
-                            continue
-                
-                # 重新显示数据
-                if state == Qt.Checked:
-                    # 使用原始数据进行合并显示
-                    self.result_table.setRowCount(len(self.original_outline))
-                    for row, entry in enumerate(self.original_outline):
-                        for col, value in enumerate(entry):
-                            item = QTableWidgetItem(value)
-                            if self.vertical_center_checkbox.isChecked():
-                                item.setTextAlignment(Qt.AlignLeft | Qt.AlignVCenter)
-                            else:
-                                item.setTextAlignment(Qt.AlignLeft | Qt.AlignTop)
-                            self.result_table.setItem(row, col, item)
-                    
-                    # 处理合并
-                    for col in range(self.result_table.columnCount()):
-                        row = 0
-                        while row < self.result_table.rowCount():
-                            # 获取当前单元格的值
-                            current_item = self.result_table.item(row, col)
-                            if not current_item:
-                                row += 1
-                                continue
-                            
-                            current_value = current_item.text().strip()
-                            if not current_value:
-                                row += 1
-                                continue
-                            
-                            # 找到可以合并的行范围
-                            merge_start = row
-                            merge_count = 1
-                            next_row = row + 1
-                            
-                            # 检查后续行是否可以合并
-                            while next_row < self.result_table.rowCount():
-                                # 检查所有前面的列是否相同
-                                can_merge = True
-                                for prev_col in range(col):
-                                    prev_current = self.result_table.item(merge_start, prev_col)
-                                    prev_next = self.result_table.item(next_row, prev_col)
-                                    if (prev_current and prev_current.text().strip()) != (prev_next and prev_next.text().strip()):
-                                        can_merge = False
-                                        break
-                                
-                                if not can_merge:
-                                    break
-                                    
-                                # 检查当前列的值是否相同
-                                next_item = self.result_table.item(next_row, col)
-                                next_value = next_item.text().strip() if next_item else ''
-                                
-                                if next_value == current_value:
-                                    merge_count += 1
-                                    next_row += 1
-                                else:
-                                    break
-                            
-                            # 如果找到可以合并的行
-                            if merge_count > 1:
-                                try:
-                                    # 设置合并
-                                    self.result_table.setSpan(merge_start, col, merge_count, 1)
-                                    # 设置合并后的单元格样式
-                                    merged_item = QTableWidgetItem(current_value)
-                                    if self.vertical_center_checkbox.isChecked():
-                                        merged_item.setTextAlignment(Qt.AlignLeft | Qt.AlignVCenter)
-                                    else:
-                                        merged_item.setTextAlignment(Qt.AlignLeft | Qt.AlignTop)
-                                    self.result_table.setItem(merge_start, col, merged_item)
-                                except Exception as e:
-                                    print(f"设置合并单元格时出错: {str(e)}")
-                            
-                            row = merge_start + merge_count
-                else:
-                    # 显示去重后的数据
-                    self.result_table.setRowCount(len(self.deduped_outline))
-                    for row, entry in enumerate(self.deduped_outline):
-                        for col, value in enumerate(entry):
-                            item = QTableWidgetItem(value)
-                            item.setTextAlignment(Qt.AlignLeft | Qt.AlignTop)
-                            self.result_table.setItem(row, col, item)
-                
-                # 调整列宽和行高
-                if self.auto_width_checkbox.isChecked():
-                    QTimer.singleShot(100, self.adjust_auto_column_widths)
-                else:
-                    self.adjust_equal_column_widths()
-                self.adjust_row_heights()
-                
-            finally:
-                # 重新启用所有控件
-                self.setEnabled(True)
-                QApplication.processEvents()
-                # 隐藏进度条
-                self.show_progress(False)
-            
-        except Exception as e:
-            # 确保界面可用
-            self.setEnabled(True)
-            self.show_progress(False)
-            QApplication.processEvents()
-            QMessageBox.warning(self, "错误", f"处理合并单元格时出错：{str(e)}")
-            # 出错时尝试恢复界面状态
-            if hasattr(self, 'original_outline'):
-                self.show_results(self.original_outline)
+        """处理合并单元格复选框状态改变：切换数据源并增减合并区域，不重建表格"""
+        merged = state == Qt.Checked
+        # 启用/禁用竖直居中选项
+        self.vertical_center_checkbox.setEnabled(merged)
+        self.result_delegate.vertical_center = merged and self.vertical_center_checkbox.isChecked()
+        
+        # 如果没有数据，直接返回
+        if not hasattr(self, 'original_outline') or not self.original_outline:
+            return
+        
+        self.result_model.set_merged(merged)
+        if merged:
+            self.apply_merge_spans()
+        else:
+            self.result_table.clearSpans()
 
     def on_vertical_center_changed(self, state):
-        """处理竖直居中复选框状态改变"""
-        try:
-            # 如果没有数据，直接返回
-            if not hasattr(self, 'original_outline') or not self.original_outline:
-                return
-                
-            # 仅更新单元格的对齐方式，不重新处理合并
-            for row in range(self.result_table.rowCount()):
-                for col in range(self.result_table.columnCount()):
-                    item = self.result_table.item(row, col)
-                    if item:
-                        if state == Qt.Checked:
-                            item.setTextAlignment(Qt.AlignLeft | Qt.AlignVCenter)
-                        else:
-                            item.setTextAlignment(Qt.AlignLeft | Qt.AlignTop)
-            
-        except Exception as e:
-            QMessageBox.warning(self, "错误", f"更新单元格对齐方式时出错：{str(e)}")
+        """处理竖直居中复选框状态改变，只重绘可见区域"""
+        self.result_delegate.vertical_center = (state == Qt.Checked) and self.merge_checkbox.isChecked()
+        self.result_table.viewport().update()
 
     def on_auto_width_changed(self, state):
         """处理自适应列宽复选框状态改变"""
@@ -1626,15 +3689,15 @@ class MainWindow(QMainWindow):
                 self.adjust_auto_column_widths()
             else:
                 self.adjust_equal_column_widths()
-            # 调整完列宽后自动调整行高
-            self.adjust_row_heights()
+                # 调整完列宽后自动调整行高
+                self.adjust_row_heights()
 
     def on_remove_page_changed(self, state):
         """处理移除页码复选框状态改变"""
         self.extractor.remove_page_numbers = (state == Qt.Checked)
         # 如果已经有提取结果，重新提取
         if hasattr(self, 'extracted_text'):
-            self.extract_outline()
+            self.schedule_extract()
 
     def on_force_ocr_changed(self, state):
         """处理强制OCR复选框状态改变"""
@@ -1688,7 +3751,7 @@ class MainWindow(QMainWindow):
                         "Tesseract-OCR未安装中文语言包(chi_sim)。\n"
                         "请到Tesseract官网下载中文语言包并放置到tessdata目录。")
             except Exception as e:
-                print(f"检查语言包时出错: {e}")
+                logger.warning("检查语言包时出错: %s", e)
             
             # 提示用户OCR可能需要时间
             QMessageBox.information(self, "OCR处理", 
@@ -1703,20 +3766,56 @@ class MainWindow(QMainWindow):
             if hasattr(self, 'extracted_text'):
                 # 清除之前的结果，强制重新OCR
                 delattr(self, 'extracted_text')
-                self.extract_outline()
+                self.schedule_extract()
         else:
             # 关闭强制OCR，恢复正常模式
             if hasattr(self, 'extracted_text'):
                 # 清除之前的结果，使用普通方式重新提取
                 delattr(self, 'extracted_text')
-                self.extract_outline()
+                self.schedule_extract()
 
     def on_colon_truncate_changed(self, state):
         """处理冒号截断复选框状态改变"""
         self.extractor.colon_truncate = (state == Qt.Checked)
         # 如果已经有提取结果，重新提取
         if hasattr(self, 'extracted_text'):
-            self.extract_outline()
+            self.schedule_extract()
+
+    def on_sequence_filter_changed(self, state):
+        """处理序号连续性过滤复选框状态改变"""
+        self.extractor.sequence_filter = (state == Qt.Checked)
+        # 如果已经有提取结果，重新提取
+        if hasattr(self, 'extracted_text'):
+            self.schedule_extract()
+
+    def on_remove_headers_changed(self, state):
+        """处理去除页眉页脚复选框状态改变"""
+        self.extractor.remove_headers_footers = (state == Qt.Checked)
+        # 如果已经有提取结果，重新提取
+        if hasattr(self, 'extracted_text'):
+            self.schedule_extract()
+
+    def on_geometry_pages_changed(self, state):
+        """处理按位置识别页码复选框状态改变"""
+        self.extractor.geometry_pages = (state == Qt.Checked)
+        # 页码在提取文本时识别，需要重新提取
+        if hasattr(self, 'extracted_text'):
+            delattr(self, 'extracted_text')
+            self.schedule_extract()
+
+    def on_use_links_changed(self, state):
+        """处理按目录链接提取复选框状态改变"""
+        self.extractor.use_links = (state == Qt.Checked)
+        # 如果已经有提取结果，重新提取
+        if hasattr(self, 'extracted_text'):
+            self.schedule_extract()
+
+    def on_dedupe_rows_changed(self, state):
+        """处理去除重复条目复选框状态改变"""
+        self.extractor.deduplicate_rows = (state == Qt.Checked)
+        # 如果已经有提取结果，重新提取
+        if hasattr(self, 'extracted_text'):
+            self.schedule_extract()
 
     def refresh_tables_layout(self):
         """刷新两个表格的布局"""
@@ -1740,138 +3839,134 @@ class MainWindow(QMainWindow):
         # 刷新result_table的列宽
         header = self.result_table.horizontalHeader()
         total_width = self.result_table.viewport().width()
-        column_count = self.result_table.columnCount()
+        column_count = self.result_model.columnCount()
         if column_count > 0:  # 确保有列才进行平分
             column_width = total_width // column_count
             for i in range(column_count):
                 header.setSectionResizeMode(i, QHeaderView.Interactive)
                 header.resizeSection(i, column_width)
     
-    def resizeEvent(self, event):
-        """窗口大小改变时触发"""
-        super().resizeEvent(event)
-        # 窗口大小改变时，延迟刷新表格布局
-        QTimer.singleShot(100, self.refresh_tables_layout)
-        
-        # 根据是否自适应列宽来设置宽度
+    def schedule_relayout(self):
+        self.scheduler.schedule('layout', self.relayout_tables, RELAYOUT_DELAY_MS)
+    
+    def relayout_tables(self):
+        """按当前窗口大小重新布局两个表格，启用自适应列宽时再按内容设置结果表格的列宽"""
+        self.refresh_tables_layout()
         if self.auto_width_checkbox.isChecked():
             self.adjust_auto_column_widths()
         else:
-            self.adjust_equal_column_widths()
+            self.adjust_row_heights()
+    
+    def resizeEvent(self, event):
+        """窗口大小改变时触发"""
+        super().resizeEvent(event)
+        # 拖动窗口边缘时会连续触发，停止变化后只重新布局一次
+        self.schedule_relayout()
 
     def save_to_excel(self):
+        # 刚改过设置、重新解析还在等待时立即开始，避免把按旧设置得到的结果保存下来
+        self.scheduler.flush('extract')
+        if self.worker is not None:
+            QMessageBox.information(self, "提示", "正在按最新设置重新提取目录，完成后再保存")
+            return
         save_path, _ = QFileDialog.getSaveFileName(
             self, "保存结果", "", "Excel文件 (*.xlsx)")
         if save_path:
             try:
-                wb = openpyxl.Workbook()
-                ws = wb.active
-
-                # 写入表头
-                headers = [f"{convert_to_chinese_num(i+1)}级目录" for i in range(len(self.samples))]
-                for col, header in enumerate(headers, 1):
-                    ws.cell(row=1, column=col, value=header)
-
-                # 从表格中获取当前显示的数据
-                for row in range(self.result_table.rowCount()):
-                    for col in range(self.result_table.columnCount()):
-                        # Excel的行列号从1开始，且要考虑表头行
-                        excel_row = row + 2
-                        excel_col = col + 1
-                        
-                        # 获取单元格内容
-                        item = self.result_table.item(row, col)
-                        if item is not None:
-                            value = item.text()
-                            cell = ws.cell(row=excel_row, column=excel_col, value=value)
-                            
-                            # 设置对齐方式
-                            if self.merge_checkbox.isChecked():
-                                if self.vertical_center_checkbox.isChecked():
-                                    cell.alignment = openpyxl.styles.Alignment(vertical='center', horizontal='left')
-                                else:
-                                    cell.alignment = openpyxl.styles.Alignment(vertical='top', horizontal='left')
-                            else:
-                                cell.alignment = openpyxl.styles.Alignment(vertical='top', horizontal='left')
-
-                # 如果需要合并单元格
-                if self.merge_checkbox.isChecked():
-                    # 遍历每一列
-                    for col in range(self.result_table.columnCount()):
-                        row = 0
-                        while row < self.result_table.rowCount():
-                            # 获取合并信息
-                            rowspan = self.result_table.rowSpan(row, col)
-                            colspan = self.result_table.columnSpan(row, col)
-                            
-                            # 如果是合并单元格
-                            if rowspan > 1 or colspan > 1:
-                                # Excel的行列号从1开始，且要考虑表头行
-                                start_row = row + 2
-                                start_col = col + 1
-                                end_row = start_row + rowspan - 1
-                                end_col = start_col + colspan - 1
-                                
-                                # 合并单元格
-                                ws.merge_cells(
-                                    start_row=start_row,
-                                    start_column=start_col,
-                                    end_row=end_row,
-                                    end_column=end_col
-                                )
-                                
-                                # 设置合并后的单元格样式
-                                merged_cell = ws.cell(row=start_row, column=start_col)
-                                if self.vertical_center_checkbox.isChecked():
-                                    merged_cell.alignment = openpyxl.styles.Alignment(vertical='center', horizontal='left')
-                                else:
-                                    merged_cell.alignment = openpyxl.styles.Alignment(vertical='top', horizontal='left')
-                            
-                            # 移动到下一个未合并的单元格
-                            row += max(rowspan, 1)
-
-                # 自动调整列宽
-                for col in ws.columns:
-                    max_length = 0
-                    column = col[0].column_letter
-                    for cell in col:
-                        try:
-                            if cell.value:  # 只处理有值的单元格
-                                cell_length = 0
-                                for char in str(cell.value):
-                                    if ord(char) > 127:  # 中文字符
-                                        cell_length += 2
-                                    else:
-                                        cell_length += 1
-                                max_length = max(max_length, cell_length)
-                        except:
-                            pass
-                    adjusted_width = max_length + 4
-                    ws.column_dimensions[column].width = adjusted_width
-
-                # 保存文件
-                wb.save(save_path)
-
-                # 显示成功对话框
-                msg_box = QMessageBox()
-                msg_box.setWindowTitle("成功")
-                msg_box.setText(f"文件已保存到：{save_path}")
-                
-                open_file_btn = msg_box.addButton("打开文件", QMessageBox.ActionRole)
-                open_folder_btn = msg_box.addButton("打开文件夹", QMessageBox.ActionRole)
-                close_btn = msg_box.addButton("关闭", QMessageBox.RejectRole)
-                
-                msg_box.exec_()
-                
-                clicked_button = msg_box.clickedButton()
-                if clicked_button == open_file_btn:
-                    os.startfile(save_path)
-                elif clicked_button == open_folder_btn:
-                    os.startfile(os.path.dirname(save_path))
+                export_start = time.perf_counter()
+                # 直接从结果模型的行和页码数组流式写出，合并区域与界面显示的相同
+                model = self.result_model
+                merged = self.merge_checkbox.isChecked()
+                writer = OutlineWorkbookWriter()
+                writer.write_sheet(
+                    self.result_headers(), model.rows, model.level_count,
+                    [model.page_array(col) for col in range(model.level_count, model.columnCount())],
+                    model.merge_spans() if merged else None,
+                    merged and self.vertical_center_checkbox.isChecked())
+                writer.save(save_path)
+                stats = self.extractor.stats
+                stats.count('export', 'rows', model.rowCount())
+                stats.add_time('export', time.perf_counter() - export_start)
+                self.dump_stats()
+
+                self.show_saved_message(save_path)
                 
             except Exception as e:
                 QMessageBox.critical(self, "错误", f"保存文件时出错：{str(e)}")
 
+    def show_saved_message(self, save_path, text=None):
+        """显示保存成功对话框，可以直接打开文件或所在文件夹"""
+        msg_box = QMessageBox()
+        msg_box.setWindowTitle("成功")
+        msg_box.setText(text or f"文件已保存到：{save_path}")
+        
+        open_file_btn = msg_box.addButton("打开文件", QMessageBox.ActionRole)
+        open_folder_btn = msg_box.addButton("打开文件夹", QMessageBox.ActionRole)
+        close_btn = msg_box.addButton("关闭", QMessageBox.RejectRole)
+        
+        msg_box.exec_()
+        
+        clicked_button = msg_box.clickedButton()
+        if clicked_button == open_file_btn:
+            os.startfile(save_path)
+        elif clicked_button == open_folder_btn:
+            os.startfile(os.path.dirname(save_path))
+
+    def batch_export(self):
+        """选择多个PDF，按当前设置在后台逐个提取，导出到同一个工作簿"""
+        if not self.samples:
+            QMessageBox.warning(self, "错误", "请先添加样本")
+            return
+        pdf_paths, _ = QFileDialog.getOpenFileNames(
+            self, "选择要批量导出的PDF文件", "", "PDF文件 (*.pdf)")
+        if not pdf_paths:
+            return
+        save_path, _ = QFileDialog.getSaveFileName(
+            self, "保存结果", "", "Excel文件 (*.xlsx)")
+        if not save_path:
+            return
+        
+        merged = self.merge_checkbox.isChecked()
+        self.batch_worker = BatchExportWorker(pdf_paths, save_path, self.current_profile(), merged,
+                                              merged and self.vertical_center_checkbox.isChecked(), self)
+        self.batch_worker.progress.connect(self.on_extract_progress)
+        self.batch_worker.done.connect(self.on_batch_done)
+        self.batch_worker.failed.connect(self.on_batch_failed)
+        self.batch_worker.finished.connect(self.on_batch_finished)
+        self.btn_batch_export.setEnabled(False)
+        self.progress_bar.setValue(0)
+        self.progress_bar.show()
+        self.btn_cancel_extract.show()
+        self.batch_worker.start()
+    
+    def on_batch_done(self, result):
+        save_path, succeeded, failures = result
+        text = f"已导出 {succeeded} 个文件到：{save_path}"
+        if failures:
+            text += f"\n{failures} 个文件提取失败，原因见汇总表"
+        self.show_saved_message(save_path, text)
+    
+    def on_batch_failed(self, message):
+        QMessageBox.critical(self, "错误", f"批量导出时出错：{message}")
+    
+    def on_batch_finished(self):
+        self.batch_worker = None
+        self.btn_batch_export.setEnabled(len(self.samples) > 0)
+        if self.worker is None:
+            self.progress_bar.hide()
+            self.progress_bar.setFormat("处理进度：%p%")
+            self.btn_cancel_extract.hide()
+
+    def dump_stats(self):
+        """设置了 PDF2EXCEL_STATS 环境变量时，把当前统计以JSON追加写入该文件"""
+        stats_path = os.environ.get('PDF2EXCEL_STATS')
+        if not stats_path:
+            return
+        try:
+            self.extractor.stats.dump(stats_path, file=getattr(self, 'current_file', ''))
+        except OSError as e:
+            logger.warning("写入统计文件失败: %s", e)
+
     def show_keyword_config(self):
         """显示关键词配置对话框"""
         dialog = KeywordDialog(self, self.extractor.blocked_keywords)
@@ -1882,7 +3977,121 @@ class MainWindow(QMainWindow):
             self.extractor.blocked_keywords = new_keywords
             # 如果已经有提取结果，重新提取
             if hasattr(self, 'extracted_text'):
-                self.extract_outline()
+                self.schedule_extract()
+
+    def save_profile(self):
+        """保存当前提取配置"""
+        file_path, _ = QFileDialog.getSaveFileName(
+            self, "保存配置", "目录提取配置.json", "配置文件 (*.json)")
+        if not file_path:
+            return
+        try:
+            self.current_profile().save(file_path)
+        except OSError as e:
+            QMessageBox.critical(self, "错误", f"保存配置时出错：{str(e)}")
+
+    def load_profile(self):
+        """加载提取配置，更新界面后只重新解析一次"""
+        file_path, _ = QFileDialog.getOpenFileName(
+            self, "加载配置", "", "配置文件 (*.json)")
+        if not file_path:
+            return
+        try:
+            profile = ExtractionProfile.load(file_path)
+            profile.level_configs  # 先编译一次，样本或正则有误时在这里报错
+        except (OSError, ValueError, TypeError, re.error) as e:
+            QMessageBox.critical(self, "错误", f"加载配置时出错：{str(e)}")
+            return
+        self.apply_profile(profile)
+
+    def apply_profile(self, profile, extract=True):
+        """把配置对象同步到界面和提取器，extract 为 False 时不重新提取，由调用方显示结果"""
+        force_ocr_changed = HAS_TESSERACT and self.force_ocr_checkbox.isChecked() != profile.force_ocr
+        geometry_changed = self.extractor.geometry_pages != profile.geometry_pages
+        self.samples = list(profile.samples)
+        self.space_required = list(profile.space_required)
+        self.extractor.apply_profile(profile)
+        if HAS_TESSERACT and profile.tesseract_cmd:
+            pytesseract.pytesseract.tesseract_cmd = profile.tesseract_cmd
+        
+        # 同步复选框，逐个触发信号会导致重复解析，这里屏蔽信号统一处理
+        checkboxes = [
+            (self.remove_page_checkbox, profile.remove_page_numbers),
+            (self.colon_truncate_checkbox, profile.colon_truncate),
+            (self.sequence_filter_checkbox, profile.sequence_filter),
+            (self.remove_headers_checkbox, profile.remove_headers_footers),
+            (self.dedupe_rows_checkbox, profile.deduplicate_rows),
+            (self.use_links_checkbox, profile.use_links),
+            (self.geometry_pages_checkbox, profile.geometry_pages),
+        ]
+        if HAS_TESSERACT:
+            checkboxes.append((self.force_ocr_checkbox, profile.force_ocr))
+        for checkbox, checked in checkboxes:
+            checkbox.blockSignals(True)
+            checkbox.setChecked(checked)
+            checkbox.blockSignals(False)
+        
+        self.update_sample_list(rebuild=False)
+        
+        # OCR或页码识别方式变化需要重新提取文本，否则直接用已有文本重新解析
+        if (force_ocr_changed or geometry_changed) and hasattr(self, 'extracted_text'):
+            delattr(self, 'extracted_text')
+        if extract and hasattr(self, 'current_file') and self.samples:
+            self.extract_outline()
+
+    def compare_profiles(self):
+        """多个配置文件并行解析当前文本，显示评分表并采用得分最高的配置"""
+        if not hasattr(self, 'extracted_text'):
+            QMessageBox.warning(self, "错误", "请先选择PDF文件")
+            return
+        file_paths, _ = QFileDialog.getOpenFileNames(
+            self, "选择要比较的配置", "", "配置文件 (*.json)")
+        if not file_paths:
+            return
+        try:
+            profiles = [ExtractionProfile.load(path) for path in file_paths]
+            for profile in profiles:
+                profile.level_configs
+        except (OSError, ValueError, TypeError, re.error) as e:
+            QMessageBox.critical(self, "错误", f"加载配置时出错：{str(e)}")
+            return
+        
+        if self.sweep_worker is not None:
+            return
+        
+        self.show_progress(True, "比较配置")
+        self.progress_bar.setRange(0, 0)  # 评分没有逐项进度，显示为忙碌状态
+        self.sweep_paths = file_paths
+        self.sweep_worker = SweepWorker(self.extracted_text, profiles, self.extractor.parallel_workers, self)
+        self.sweep_worker.done.connect(self.on_sweep_done)
+        self.sweep_worker.failed.connect(self.on_sweep_failed)
+        self.sweep_worker.finished.connect(self.on_sweep_finished)
+        self.sweep_worker.start()
+    
+    def on_sweep_done(self, result):
+        """显示评分表，采用得分最高的配置，并直接显示它已经解析好的大纲"""
+        outline, table = result
+        if getattr(self, 'extracted_text', None) is not self.sweep_worker.text:
+            return  # 比较过程中换了文件，结果已过期
+        lines = [f"{os.path.basename(self.sweep_paths[row['index']])}：得分 {row['score']:.3f}"
+                 f"（覆盖 {row['coverage']:.2f}，连续 {row['consistency']:.2f}，均衡 {row['balance']:.2f}，{row['rows']} 行）"
+                 for row in table]
+        QMessageBox.information(self, "配置比较结果", "\n".join(lines) + "\n\n已采用得分最高的配置。")
+        
+        profile = self.sweep_worker.profiles[table[0]['index']]
+        # 评分时只按文本解析；需要重新提取文本或按目录链接提取时仍走完整的提取流程
+        reuse = profile.text_key() == self.current_profile().text_key() and not profile.use_links
+        self.apply_profile(profile, extract=not reuse)
+        if reuse:
+            self.show_results(outline)
+    
+    def on_sweep_failed(self, message):
+        QMessageBox.critical(self, "错误", f"比较配置时出错：{message}")
+    
+    def on_sweep_finished(self):
+        self.sweep_worker = None
+        self.progress_bar.setRange(0, 100)
+        self.show_progress(False)
 
     def show_progress(self, show=True, text="处理中"):
         """显示或隐藏进度条
@@ -1898,19 +4107,28 @@ class MainWindow(QMainWindow):
             self.progress_bar.hide()
             self.progress_bar.setValue(0)
             self.progress_bar.setFormat("处理进度：%p%")
-    
-    def update_progress(self, value, maximum=100):
-        """更新进度条
-        Args:
-            value: 当前进度值
-            maximum: 最大进度值
-        """
-        progress = int((value / maximum) * 100)
-        self.progress_bar.setValue(progress)
-        QApplication.processEvents()
+
+
+def setup_logging():
+    """配置日志：级别由 PDF2EXCEL_LOG_LEVEL 控制，PDF2EXCEL_LOG_FILE 可指定日志文件"""
+    level = getattr(logging, os.environ.get('PDF2EXCEL_LOG_LEVEL', 'WARNING').upper(), logging.WARNING)
+    log_file = os.environ.get('PDF2EXCEL_LOG_FILE')
+    if log_file:
+        handler = logging.FileHandler(log_file, encoding='utf-8')
+    elif sys.stderr is not None:
+        handler = logging.StreamHandler()
+    else:
+        # 打包为无控制台程序时没有stderr
+        handler = logging.NullHandler()
+    handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(message)s'))
+    logger.addHandler(handler)
+    logger.setLevel(level)
 
 
 if __name__ == "__main__":
+    # 打包后的程序启动子进程（正则探测等）需要
+    multiprocessing.freeze_support()
+    setup_logging()
     app = QApplication(sys.argv)
     
     # 设置应用程序级别的图标
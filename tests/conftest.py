@@ -0,0 +1,26 @@
+import importlib.util
+import os
+import sys
+
+import pytest
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "PDF 目录提取.py")
+
+
+@pytest.fixture(scope="session")
+def app():
+    """按文件路径加载主程序模块（文件名含空格和中文，不能直接 import）"""
+    spec = importlib.util.spec_from_file_location("pdf_outline_app", APP_PATH)
+    module = importlib.util.module_from_spec(spec)
+    # 并行解析的子进程按模块名查找函数，须登记到 sys.modules
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture
+def make_extractor(app):
+    def make(samples, **options):
+        profile = app.ExtractionProfile(samples=samples, space_required=[False] * len(samples), **options)
+        return app.OutlineExtractor.from_profile(profile)
+    return make
@@ -0,0 +1,21 @@
+def test_body_page_folio_is_not_joined_to_heading(make_extractor):
+    extractor = make_extractor(["n.", "n.n"])
+    text = "\n".join([
+        "=== 第1页 ===", "1. 引言", "本文讨论某问题。", "3.2 结论", "本节讨论了很多内容", "12",
+        "=== 第2页 ===", "2. 方法", "正文", "13",
+    ])
+    outline = extractor.parse_text(text)
+    assert [row[:2] for row in outline] == [["1. 引言", "3.2 结论"], ["2. 方法", ""]]
+    assert list(outline.pages) == [0, 0]
+    assert list(outline.pdf_pages) == [1, 2]
+
+
+def test_wrapped_toc_titles_are_still_joined(make_extractor):
+    extractor = make_extractor(["n."])
+    text = "\n".join([
+        "=== 第1页 ===", "1. 引言 ......", "5", "2. 方法很长的标题", "的折行部分", "8",
+        "3. 结果很长的标题", "的折行部分 ...... 9", "4. 讨论", "12",
+    ])
+    outline = extractor.parse_text(text)
+    assert [row[0] for row in outline] == ["1. 引言", "2. 方法很长的标题的折行部分", "3. 结果很长的标题的折行部分", "4. 讨论"]
+    assert list(outline.pages) == [5, 8, 9, 12]
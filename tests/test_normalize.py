@@ -0,0 +1,30 @@
+import pytest
+
+
+@pytest.mark.parametrize("text", [
+    "1.Overview",
+    "3.Object model",
+    "1.lntroduction",
+    "2 Open issues",
+    "l.2 limits",
+])
+def test_ocr_digit_fix_keeps_words(app, text):
+    assert app.TextNormalizer().normalize(text) == text
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("1O.2 总则", "10.2 总则"),
+    ("2.1O 节", "2.10 节"),
+    ("1O1 条", "101 条"),
+    ("1Ol. 附则", "101. 附则"),
+])
+def test_ocr_digit_fix_repairs_numbers(app, text, expected):
+    assert app.TextNormalizer().normalize(text) == expected
+
+
+def test_english_titles_starting_with_o_or_l_stay_top_level(make_extractor):
+    extractor = make_extractor(["n.", "n.n"])
+    text = "=== 第1页 ===\n1.Introduction\n2.Overview\n3.Open issues\n4.lmplementation\n"
+    outline = extractor.parse_text(text)
+    assert [row[0] for row in outline] == ["1.Introduction", "2.Overview", "3.Open issues", "4.lmplementation"]
+    assert all(not row[1] for row in outline)
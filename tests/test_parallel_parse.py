@@ -0,0 +1,44 @@
+import pytest
+
+
+def generated_toc(app, pages):
+    """生成带页眉页脚、折行标题、单独成行的页码和编号的多页目录文本"""
+    lines = []
+    for page in range(1, pages + 1):
+        lines += [f"=== 第{page}页 ===", "某某技术报告"]
+        chapter = (page - 1) // 10
+        if page % 10 == 1:
+            lines.append(f"{app.convert_to_chinese_num(chapter + 1)}、第{chapter + 1}章 总体说明")
+        name = "".join("零一二三四五六七八九"[int(digit)] for digit in str(page))  # 标题逐页不同，不会被当作页眉页脚
+        for k in range(1, 11):
+            number = (page - 1) % 10 * 10 + k
+            if k == 3:
+                lines += [f"{number}. 第{name}页比较长的标题，需要折行", "继续的内容 ..........", str(page * 3)]
+            elif k == 6:
+                lines += [f"{number}.", f"单独成行的编号之后的标题{name}"]
+            else:
+                lines.append(f"{number}. 条目{name}之{k} ........ {page * 3 + k}")
+            lines.append(f"正文第{k}行说明文字")
+        lines.append(str(page))
+    return "\n".join(lines)
+
+
+@pytest.mark.parametrize("sequence_filter", [False, True])
+def test_chunked_parse_matches_serial(app, make_extractor, monkeypatch, sequence_filter):
+    text = generated_toc(app, 400)
+
+    serial = make_extractor(["c、", "n."], sequence_filter=sequence_filter)
+    serial.parallel_workers = 1
+    expected = serial.parse_text(text)
+
+    # 降低阈值，让这份约一万行的文本也走分块并行解析
+    monkeypatch.setattr(app, "PARALLEL_PARSE_MIN_LINES", 1000)
+    parallel = make_extractor(["c、", "n."], sequence_filter=sequence_filter)
+    parallel.parallel_workers = 2
+    outline = parallel.parse_text(text)
+
+    assert parallel.stats.counters['parse'].get('chunks', 0) > 1
+    assert len(expected) > 3000
+    assert outline == expected
+    assert outline.pages == expected.pages
+    assert outline.pdf_pages == expected.pdf_pages
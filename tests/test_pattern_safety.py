@@ -0,0 +1,46 @@
+import pytest
+
+
+def errors(app, pattern):
+    return [message for level, message in app.lint_pattern(pattern) if level == 'error']
+
+
+@pytest.mark.parametrize("pattern", [
+    r"^(a|a)*$",
+    r"^(?:\d|\d\d)+$",
+    r"^(?:\s|\s\s)+x",
+    r"^(\s*\d+)+$",
+    r"^(\d+)+$",
+])
+def test_lint_rejects_ambiguous_repeats(app, pattern):
+    assert errors(app, pattern)
+
+
+@pytest.mark.parametrize("pattern", [
+    r"^(ab|ac)+$",
+    r"^(ab|ba)+$",
+    r"^(?:\s|x)+$",
+    r"^(?:\d{1,3}\.)*\d{1,3}\s",
+    r"^\d+(\.\d+)*\s+\S.*",
+    r"^(\d+\.)+\s*\S",
+])
+def test_lint_accepts_unambiguous_repeats(app, pattern):
+    assert not errors(app, pattern)
+
+
+@pytest.mark.parametrize("sample", ["c、", "n", "n.n", "n.n.n", "(n)", "第c章", "第n节", "a.", "r."])
+@pytest.mark.parametrize("space_required", [False, True])
+def test_generated_patterns_pass_lint(app, sample, space_required):
+    for config in app.build_level_configs([sample], [space_required], None):
+        assert not errors(app, config['pattern'].pattern)
+
+
+@pytest.mark.parametrize("pattern", [r"^\d+(\.\d+)*\s+\S.*", r"^(\d+\.)+\s*\S"])
+def test_unambiguous_nested_repeats_pass_probe(app, pattern):
+    issues = app.check_pattern_safety(pattern, timeout=5.0)
+    assert ('error' not in [level for level, _ in issues])
+
+
+def test_probe_rejects_adjacent_digit_runs(app):
+    with pytest.raises(app.PatternSafetyError):
+        app.check_pattern_safety(r"^\s*\d+\s*\d+\s*\d+\s*$", timeout=1.0)
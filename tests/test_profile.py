@@ -0,0 +1,22 @@
+import json
+
+import pytest
+
+
+def test_profile_round_trip(app, tmp_path):
+    profile = app.ExtractionProfile(samples=["c、", "n.n"], space_required=[False, True], sequence_filter=True)
+    path = tmp_path / "profile.json"
+    profile.save(path)
+    assert app.ExtractionProfile.load(path) == profile
+
+
+def test_load_rejects_mismatched_space_flags(app, tmp_path):
+    path = tmp_path / "profile.json"
+    path.write_text(json.dumps({"samples": ["c、", "n.n"], "space_required": [False]}), encoding="utf-8")
+    with pytest.raises(ValueError):
+        app.ExtractionProfile.load(path)
+
+
+def test_constructor_rejects_mismatched_space_flags(app):
+    with pytest.raises(ValueError):
+        app.ExtractionProfile(samples=["c、", "n.n"], space_required=[False])
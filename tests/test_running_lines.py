@@ -0,0 +1,31 @@
+def toc_text():
+    """目录页的最后几条页码单独成行，落在页脚区域内；其余各页只有正文和页脚页码"""
+    toc = ["目录"]
+    for number, page in zip("一二三四五六七八", [1, 4, 7, 10, 13, 17, 21, 24]):
+        toc += [f"第{number}章 内容{number}", str(page)]
+    pages = [toc] + [[f"正文{'甲乙丙丁'[n - 2]}{'子丑寅卯'[k]}" for k in range(4)] + [str(n)] for n in range(2, 6)]
+    return "\n".join(f"=== 第{n}页 ===\n" + "\n".join(page) for n, page in enumerate(pages, 1))
+
+
+def test_toc_page_numbers_in_footer_band_are_kept(make_extractor):
+    outline = make_extractor(["第c章"]).parse_text(toc_text())
+    assert [row[0] for row in outline][-2:] == ["第七章 内容七", "第八章 内容八"]
+    assert list(outline.pages) == [1, 4, 7, 10, 13, 17, 21, 24]
+
+
+def test_folios_are_still_removed(app):
+    lines = [line for line in toc_text().split("\n")]
+    kept, removed = app.remove_running_lines(lines, is_entry=lambda line: line.startswith("第") and "章" in line)
+    assert removed == 4
+    assert kept[-1] == "正文丁卯"
+    assert "21" in kept and "24" in kept
+
+
+def test_folio_on_short_page_is_removed(app):
+    """短页上的页脚同时落在顶部带内，仍按底部页脚统计并去除"""
+    pages = [[f"正文{'甲乙丙丁'[n - 1]}{'子丑寅卯辰巳'[k]}" for k in range(6)] + [str(n)] for n in range(1, 5)]
+    pages.append(["正文戊子", "5"])
+    lines = "\n".join(f"=== 第{n}页 ===\n" + "\n".join(page) for n, page in enumerate(pages, 1)).split("\n")
+    kept, removed = app.remove_running_lines(lines)
+    assert removed == 5
+    assert not any(line.isdigit() for line in kept)
@@ -0,0 +1,53 @@
+import pytest
+
+
+def chain(app, numbers, max_gap=2):
+    return sorted(app.longest_ordinal_chain([((), n) for n in numbers], max_gap))
+
+
+@pytest.mark.parametrize("numbers, expected", [
+    ([1, 2, 3, 4], [0, 1, 2, 3]),
+    ([1, 5, 6, 7, 8, 9, 10], [1, 2, 3, 4, 5, 6]),
+    ([3, 4, 5, 6, 7, 1], [0, 1, 2, 3, 4]),
+    # 长度相近时从头编号的链优先
+    ([7, 8, 9, 1, 2, 3], [3, 4, 5]),
+])
+def test_longest_ordinal_chain(app, numbers, expected):
+    assert chain(app, numbers) == expected
+
+
+def test_children_of_dropped_parent_are_dropped(make_extractor):
+    extractor = make_extractor(["c、", "n"], sequence_filter=True)
+    text = "\n".join([
+        "=== 第1页 ===",
+        "一、甲", "1 子一", "2 子二",
+        "二、乙", "1 子三",
+        "五、噪声", "1 噪声子一", "2 噪声子二",
+        "三、丙", "1 子四",
+    ])
+    outline = extractor.parse_text(text)
+    assert [row[:2] for row in outline] == [
+        ["一、甲", "1 子一"], ["一、甲", "2 子二"],
+        ["二、乙", "1 子三"],
+        ["三、丙", "1 子四"],
+    ]
+
+
+@pytest.mark.parametrize("sample, kind, position", [
+    ("n.n", "n", 1),
+    ("c、", "c", 0),
+    ("第n节", "n", 0),
+    ("(c)", "c", 0),
+    # 原样匹配的文字中的字母不是编号类型
+    ("Section n.n", "n", 1),
+    ("Chapter c", "c", 0),
+])
+def test_compile_sample_takes_kind_from_tokens(app, sample, kind, position):
+    pattern, sample_kind, ordinal_position = app.compile_sample(sample)
+    assert (sample_kind, ordinal_position) == (kind, position)
+
+
+def test_literal_words_in_sample_are_matched_verbatim(app):
+    pattern, _, _ = app.compile_sample("Section n.n")
+    assert pattern.match("Section 3.2 Results")
+    assert not pattern.match("Sec 3.2 Results")